@@ -0,0 +1,155 @@
+import numpy as np
+import scipy.sparse as sp
+from scipy.linalg import eigh
+from scipy.sparse.linalg import LinearOperator, eigsh, lobpcg
+
+
+SOLVERS = ('auto', 'dense', 'arpack', 'lobpcg')
+
+# matrices up to this size are always solved densely.
+DENSE_MAX_N = 2000
+
+# dense arrays with a smaller fraction of non-zeros are converted
+# to CSR before solving.
+SPARSE_MAX_DENSITY = 0.05
+
+
+def choose_solver(mat, m):
+    """
+    Picks an eigensolver for the m smallest eigenpairs of `mat'
+    based on its size and sparsity.
+
+    Above DENSE_MAX_N, sparse matrices and operators go to LOBPCG,
+    which only needs products with `mat'. Shift-invert ARPACK is never
+    chosen automatically: the LU factors of the shifted Laplacian of a
+    random graph fill in to nearly n*n entries, which makes it slower
+    than the dense solver.
+
+    Params:
+        mat (np.ndarray, scipy.sparse matrix or LinearOperator):
+            n*n symmetric matrix.
+        m (int): the number of eigenpairs required.
+
+    Returns:
+        solver (str): 'dense' or 'lobpcg'.
+    """
+    n = mat.shape[0]
+
+    if n <= DENSE_MAX_N or m >= n-1:
+        return 'dense'
+
+    if isinstance(mat, LinearOperator):
+        return 'lobpcg' if n >= 5*m else 'dense'
+
+    if not sp.issparse(mat) and \
+            np.count_nonzero(mat) >= SPARSE_MAX_DENSITY*n*n:
+        return 'dense'
+
+    return 'lobpcg'
+
+
+def smallest_eigh(mat, m, solver='auto', tol=None, seed=None, B=None):
+    """
+    Computes the m smallest eigenvalues and the corresponding
+    eigenvectors of a symmetric matrix, or of the generalized
+    problem mat @ v = w * B @ v when B is given.
+
+    Params:
+        mat (np.ndarray, scipy.sparse matrix or LinearOperator):
+            n*n symmetric matrix.
+        m (int): the number of eigenpairs required.
+        solver (str): (optional) one of
+            'dense'  -> LAPACK eigh computing only the first m pairs,
+            'arpack' -> ARPACK eigsh (shift-invert for sparse matrices,
+                        only on request),
+            'lobpcg' -> LOBPCG with a random initial block,
+            'auto'   -> chosen by `choose_solver'.
+        tol (float): (optional) tolerance of the iterative solvers.
+        seed (int): (optional) seed for the initial block of LOBPCG.
+        B (np.ndarray, scipy.sparse matrix or LinearOperator):
+            (optional) n*n symmetric positive definite matrix of the
+            generalized problem. ARPACK falls back to LOBPCG when
+            either matrix is a LinearOperator.
+
+    Returns:
+        w (np.ndarray): the m smallest eigenvalues in ascending order.
+        v (np.ndarray): n*m matrix, ith column is the eigenvector of
+                        the ith eigenvalue (B-orthonormal if B is given).
+    """
+    assert solver in SOLVERS, "unknown solver: {}".format(solver)
+
+    if solver == 'auto':
+        solver = choose_solver(mat, m)
+
+    if solver == 'dense':
+        return _dense_eigh(mat, m, B)
+
+    if solver == 'arpack':
+        if B is not None and (isinstance(mat, LinearOperator) or
+                              isinstance(B, LinearOperator)):
+            return _lobpcg_eigh(mat, m, tol, seed, B)
+        return _arpack_eigh(mat, m, tol, B)
+
+    return _lobpcg_eigh(mat, m, tol, seed, B)
+
+
+def _to_dense(mat):
+    if isinstance(mat, LinearOperator):
+        return mat @ np.eye(mat.shape[0])
+
+    if sp.issparse(mat):
+        return mat.toarray()
+
+    return np.asarray(mat)
+
+
+def _sort(w, v):
+    order = np.argsort(w)
+    return w[order], v[:, order]
+
+
+def _dense_eigh(mat, m, B=None):
+    mat = _to_dense(mat)
+    if B is not None:
+        B = _to_dense(B)
+    return eigh(mat, B, subset_by_index=[0, m-1])
+
+
+def _arpack_eigh(mat, m, tol, B=None):
+    n = mat.shape[0]
+    if m >= n-1:
+        # ARPACK cannot compute all the eigenpairs.
+        return _dense_eigh(mat, m, B)
+
+    tol = 0 if tol is None else tol
+
+    if isinstance(mat, LinearOperator):
+        w, v = eigsh(mat, k=m, which='SA', tol=tol)
+        return _sort(w, v)
+
+    if not sp.issparse(mat):
+        mat = sp.csr_matrix(mat)
+
+    if B is not None and not sp.issparse(B):
+        B = sp.csr_matrix(B)
+
+    # Laplacians are singular, so shift slightly below 0.
+    w, v = eigsh(mat.tocsc(), k=m, M=B, sigma=-1e-3, which='LM', tol=tol)
+    return _sort(w, v)
+
+
+def _lobpcg_eigh(mat, m, tol, seed, B=None):
+    n = mat.shape[0]
+    if n < 5*m:
+        # LOBPCG is not meant for blocks this large relative to n.
+        return _dense_eigh(mat, m, B)
+
+    if isinstance(mat, np.ndarray):
+        # sparse enough not to be solved densely, see `choose_solver'.
+        mat = sp.csr_matrix(mat)
+
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((n, m))
+    w, v = lobpcg(mat, X, B=B, tol=tol, maxiter=max(500, 10*m),
+                  largest=False)
+    return _sort(w, v)
@@ -0,0 +1,226 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import scipy.sparse as sp
+
+from .eigensolvers import smallest_eigh
+from .spectral_clustering import kMM, _get_adj_mat, _get_operators
+from utils.utils import (get_balance, get_cut_metrics,
+                         get_group_cluster_matrix)
+
+
+class FairSpectralClustering:
+    """
+    Spectral clustering (with or without the population fairness
+    constraint) that keeps the graph operators and the spectral
+    embedding between calls.
+
+    `fit' builds the Laplacian (and the fairness operators) and
+    computes the eigenpairs once; `predict' only runs the k-means
+    stage, so trying several k or k-means settings does not redo
+    the linear algebra. The embedding is extended if a larger k than
+    the one fitted for is requested.
+
+    As in the module level functions, k+1 eigenvectors are used for
+    a graph given as a list of edges and k for an adjacency matrix,
+    so predict(k) gives the same partition as the corresponding
+    function with the same seed.
+
+    Params:
+        normalized (bool): (optional) normalized spectral clustering.
+        sparse (bool): (optional) build the adjacency and Laplacian
+                       matrices in CSR format.
+        solver (str): (optional) eigensolver, see
+                      `eigensolvers.smallest_eigh'.
+        seed (int): (optional) seed of the random number generators.
+        method (str): (optional) k-means algorithm, see
+                      `kmeans.kmeans'.
+        n_init (int): (optional) number of k-means restarts.
+        n_jobs (int): (optional) number of restarts run in parallel.
+        matrix_free (bool): (optional) apply the Laplacian through the
+                            adjacency matrix instead of assembling it.
+
+    Attributes (after fit):
+        adj_mat_ (np.ndarray or scipy.sparse matrix): adjacency matrix.
+        eigenvalues_ (np.ndarray): the computed eigenvalues, ascending.
+        embedding_ (np.ndarray): n*m matrix of the corresponding
+                                 eigenvectors.
+    """
+
+    def __init__(self, normalized=False, sparse=False, solver='auto',
+                 seed=None, method='auto', n_init=10, n_jobs=1,
+                 matrix_free=False):
+        self.normalized = normalized
+        self.sparse = sparse
+        self.solver = solver
+        self.seed = seed
+        self.method = method
+        self.n_init = n_init
+        self.n_jobs = n_jobs
+        self.matrix_free = matrix_free
+
+    def fit(self, n, edges=None, groups=None, adj_mat=None, k_max=10):
+        """
+        Builds the graph operators and computes the embedding for up
+        to k_max clusters.
+
+        Params:
+            n (int): the number of vertices in the graph.
+            edges (np.ndarray): |E|*2 matrix with each row
+                                representing an edge.
+            groups (list or np.ndarray): (optional) list of lists of
+                nodes forming the groups, or array of the group of each
+                node. Without groups no fairness constraint is applied.
+            adj_mat (np.ndarray or scipy.sparse matrix): n*n adjacency
+                matrix, used instead of edges.
+            k_max (int): (optional) largest number of clusters the
+                         embedding is computed for.
+
+        Returns:
+            self
+        """
+        assert (edges is None) != (adj_mat is None), \
+            "exactly one of edges and adj_mat must be given"
+
+        if adj_mat is None:
+            adj_mat = _get_adj_mat(n, edges, self.sparse)
+            self._offset = 1
+        else:
+            self._offset = 0
+
+        self.adj_mat_ = adj_mat
+        self.groups_ = groups
+        self._operators = _get_operators(adj_mat, groups, self.normalized,
+                                         self.matrix_free)
+        self._compute(k_max + self._offset)
+
+        return self
+
+    def _compute(self, m):
+        mat, B = self._operators
+        self.eigenvalues_, self.embedding_ = smallest_eigh(
+            mat, m, self.solver, seed=self.seed, B=B
+        )
+
+    def embedding(self, k):
+        """
+        Returns the rows of the spectral embedding used to find k
+        clusters, computing more eigenpairs if needed.
+        """
+        m = k + self._offset
+        if m > self.embedding_.shape[1]:
+            self._compute(m)
+        return self.embedding_[:, :m]
+
+    def predict(self, k, method=None, seed=None, n_init=None, n_jobs=None,
+                return_labels=False):
+        """
+        Clusters the cached embedding into k clusters. The k-means
+        settings default to the ones given to the constructor.
+
+        Returns:
+            clusters (list): list of lists. Each list is the
+                             collection of nodes forming the cluster
+                             (an int32 array of labels if
+                             return_labels).
+        """
+        return kMM(
+            k, self.embedding(k),
+            method=self.method if method is None else method,
+            seed=self.seed if seed is None else seed,
+            n_init=self.n_init if n_init is None else n_init,
+            n_jobs=self.n_jobs if n_jobs is None else n_jobs,
+            return_labels=return_labels,
+        )
+
+    def fit_predict(self, n, k, edges=None, groups=None, adj_mat=None):
+        return self.fit(n, edges, groups, adj_mat, k_max=k).predict(k)
+
+    def sweep(self, k_values, n_jobs=1):
+        """
+        Clusters the graph for every k in k_values from one
+        eigendecomposition (the embedding for k is a prefix of the one
+        for max(k_values)). The k-means stages run concurrently.
+
+        Params:
+            k_values (list): numbers of clusters to try (each >= 2).
+            n_jobs (int): (optional) number of k values clustered in
+                          parallel.
+
+        Returns:
+            report (list): one dict per k, in increasing order of k,
+                with keys
+                'k', 'labels' (int32 cluster of each node),
+                'eigengap' -> w[k] - w[k-1], the gap after the kth
+                              smallest eigenvalue,
+                'cuts' -> cut(C) of each cluster, each non-zero of
+                          the adjacency matrix counting as one edge,
+                'ratio_cut' -> sum of cut(C)/|C| over the clusters,
+                'normalized_cut' -> sum of cut(C)/vol(C) (see
+                                    `utils.get_cut_metrics'),
+                'balance' -> smallest balance over the clusters
+                             (None without groups).
+        """
+        k_values = sorted(k_values)
+        k_max = k_values[-1]
+
+        # the eigengap of k_max needs one eigenvalue more.
+        m = k_max + max(self._offset, 1)
+        if m > self.embedding_.shape[1]:
+            self._compute(m)
+        w = self.eigenvalues_
+
+        with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+            all_labels = list(pool.map(
+                lambda k: self.predict(k, n_jobs=1, return_labels=True),
+                k_values
+            ))
+
+        # the edges (both directions) and weights of the adjacency matrix.
+        if sp.issparse(self.adj_mat_):
+            coo = self.adj_mat_.tocoo()
+            edges = np.stack([coo.row, coo.col], axis=1)
+            weights = coo.data
+        else:
+            edges = np.argwhere(self.adj_mat_)
+            weights = self.adj_mat_[edges[:, 0], edges[:, 1]]
+
+        report = []
+        for k, labels in zip(k_values, all_labels):
+            entry = {'k': k, 'labels': labels,
+                     'eigengap': w[k] - w[k-1]}
+            entry['cuts'], entry['ratio_cut'], entry['normalized_cut'] = \
+                get_cut_metrics(edges, labels, k, weights)
+            entry['balance'] = None if self.groups_ is None \
+                else float(get_balance(get_group_cluster_matrix(
+                    labels, self.groups_)).min())
+            report.append(entry)
+
+        return report
+
+    def select_k(self, k_values, criterion='eigengap', n_jobs=1):
+        """
+        Picks the number of clusters from a sweep over k_values.
+
+        Params:
+            k_values (list): numbers of clusters to try.
+            criterion (str): (optional) 'eigengap' or 'balance'
+                             (largest wins), 'ratio_cut' or
+                             'normalized_cut' (smallest wins).
+            n_jobs (int): (optional) see `sweep'.
+
+        Returns:
+            k (int): the selected number of clusters.
+            report (list): the output of `sweep'.
+        """
+        assert criterion in ('eigengap', 'balance', 'ratio_cut',
+                             'normalized_cut'), \
+            "unknown criterion: {}".format(criterion)
+        assert criterion != 'balance' or self.groups_ is not None, \
+            "balance needs groups"
+
+        report = self.sweep(k_values, n_jobs)
+        sign = 1 if criterion in ('eigengap', 'balance') else -1
+        best = max(report, key=lambda entry: sign*entry[criterion])
+        return best['k'], report
+
@@ -0,0 +1,215 @@
+import numpy as np
+import scipy.sparse as sp
+from scipy.linalg import pinvh, qr
+from scipy.sparse.linalg import LinearOperator
+
+
+def _orthonormal_basis(F):
+    """
+    Orthonormal basis of the column space of F (n*(h-1)), computed
+    with a rank revealing thin QR factorization in O(n*h^2).
+    """
+    n, c = F.shape
+    if c == 0:
+        return np.zeros((n, 0))
+
+    Q, R, _ = qr(F, mode='economic', pivoting=True)
+    diag = np.abs(np.diag(R))
+    rank = np.sum(diag > max(n, c)*np.finfo(float).eps*diag[0])
+    return Q[:, :rank]
+
+
+class GroupConstraint:
+    """
+    Implicit form of the n*(h-1) fairness constraint matrix
+
+        F = S - 1 p.T
+
+    where S is the sparse n*(h-1) indicator matrix of the first h-1
+    groups and p holds their proportions in the graph. Only S, p and
+    the pseudo-inverse of the (h-1)*(h-1) Gram matrix F.T F are
+    stored, i.e. O(n + h^2) memory instead of the n*(h-1) floats of
+    F or of an orthonormal basis of its columns.
+
+    The projection onto the columns of F is F (F.T F)^+ F.T, applied
+    with two products with S and two rank-one updates.
+
+    Params:
+        indicator (scipy.sparse matrix): n*(h-1) matrix S.
+        props (np.ndarray): the h-1 proportions p.
+    """
+
+    def __init__(self, indicator, props):
+        self.S = sp.csr_matrix(indicator)
+        self.p = np.asarray(props, dtype=np.float64)
+        self.shape = self.S.shape
+        n, c = self.shape
+
+        # F.T F = S.T S - c p.T - p c.T + n p p.T, c = S.T 1
+        counts = np.asarray(self.S.sum(axis=0)).reshape(-1)
+        gram = (self.S.T @ self.S).toarray() \
+            - np.outer(counts, self.p) - np.outer(self.p, counts) \
+            + n*np.outer(self.p, self.p)
+        self.gram_pinv = pinvh(gram) if c else np.zeros((0, 0))
+
+    def matmat(self, Y):
+        """
+        F @ Y for an (h-1)*m matrix Y.
+        """
+        return self.S @ Y - np.outer(np.ones(self.shape[0]), self.p @ Y)
+
+    def rmatmat(self, X):
+        """
+        F.T @ X for an n*m matrix X.
+        """
+        return self.S.T @ X - np.outer(self.p, np.sum(X, axis=0))
+
+    def range_component(self, X):
+        """
+        Projection of a vector or an n*m matrix onto the columns of F.
+        """
+        X2 = X.reshape(self.shape[0], -1)
+        Y = self.matmat(self.gram_pinv @ self.rmatmat(X2))
+        return Y.reshape(X.shape)
+
+
+def _spectral_bound(lap_mat):
+    """
+    Gershgorin upper bound on the eigenvalues of `lap_mat'.
+    """
+    if isinstance(lap_mat, LaplacianOperator):
+        return 2*np.max(lap_mat.deg, initial=0)
+    if sp.issparse(lap_mat):
+        return abs(lap_mat).sum(axis=1).max()
+    return np.abs(lap_mat).sum(axis=1).max()
+
+
+class LaplacianOperator(LinearOperator):
+    """
+    Implicit form of the Laplacian D - A of an adjacency matrix A,
+    applied as deg*x - A @ x.
+
+    Only the degrees are stored besides A, so an adjacency matrix whose
+    arrays are memory-mapped (see `utils.graph_io') is used in place:
+    L is never assembled and A is never copied.
+
+    Params:
+        adj_mat (np.ndarray or scipy.sparse matrix): n*n adjacency
+                                                     matrix.
+        deg (np.ndarray): (optional) the degrees, if already computed.
+    """
+
+    def __init__(self, adj_mat, deg=None):
+        n = adj_mat.shape[0]
+        super().__init__(dtype=np.float64, shape=(n, n))
+        self.adj_mat = adj_mat
+        if deg is None:
+            deg = np.asarray(adj_mat.sum(axis=0),
+                             dtype=np.float64).reshape(-1)
+        self.deg = deg
+
+    def _matmat(self, X):
+        return self.deg[:, None]*X - self.adj_mat @ X
+
+    def _matvec(self, x):
+        return self._matmat(x.reshape(-1, 1)).reshape(x.shape)
+
+    def _adjoint(self):
+        return self
+
+
+class FairLaplacianOperator(LinearOperator):
+    """
+    Implicit form of the fair Laplacian Z.T @ lap_mat @ Z, where the
+    columns of Z form an orthonormal basis of the null space of F.T.
+
+    Z is never formed. The operator acts on R^n as
+
+        Z (Z.T L Z) Z.T + shift*(I - Z Z.T) = P L P + shift*(I - P)
+
+    where P = Z Z.T = I - Q Q.T is the projection onto the null space
+    of F.T and Q is an orthonormal basis of the h-1 columns of F, so
+    applying it costs one product with L plus O(n*h). When F is given
+    as a `GroupConstraint', Q Q.T is applied through it instead and
+    no n*h matrix is formed. With the shift
+    above the largest eigenvalue of L, the smallest eigenpairs of
+    this operator are those of Z.T L Z, with the eigenvectors already
+    multiplied by Z (i.e. the rows of H = Z @ Y in the paper).
+
+    Params:
+        lap_mat (np.ndarray, scipy.sparse matrix or LaplacianOperator):
+            n*n Laplacian.
+        F (np.ndarray or GroupConstraint): n*(h-1) fairness
+                                           constraint matrix.
+        shift (float): (optional) eigenvalue assigned to the
+                       directions removed by the constraint.
+        basis (np.ndarray or GroupConstraint): (optional) orthonormal
+            basis Q of the columns of F (or the implicit F itself), if
+            already computed.
+    """
+
+    def __init__(self, lap_mat, F, shift=None, basis=None):
+        n = lap_mat.shape[0]
+        super().__init__(dtype=np.float64, shape=(n, n))
+        self.lap_mat = lap_mat
+        if basis is None:
+            basis = F if isinstance(F, GroupConstraint) \
+                else _orthonormal_basis(F)
+        self.Q = basis
+
+        if shift is None:
+            shift = _spectral_bound(lap_mat) + 1
+        self.shift = shift
+
+    def project(self, X):
+        """
+        Applies P = Z Z.T (the projection onto the null space of F.T)
+        to a vector or an n*m matrix.
+        """
+        if isinstance(self.Q, GroupConstraint):
+            return X - self.Q.range_component(X)
+        return X - self.Q @ (self.Q.T @ X)
+
+    def _matmat(self, X):
+        PX = self.project(X)
+        return self.project(self.lap_mat @ PX) + self.shift*(X - PX)
+
+    def _matvec(self, x):
+        return self._matmat(x.reshape(-1, 1)).reshape(x.shape)
+
+    def _adjoint(self):
+        return self
+
+
+def fair_generalized_pencil(lap_mat, deg_mat, F):
+    """
+    Implicit form of the generalized problem
+
+        (Z.T L Z) y = w (Z.T D Z) y
+
+    solved by normalized spectral clustering with the fairness
+    constraint. It is equivalent to the eigenproblem of
+    Q^-1 (Z.T L Z) Q^-1 with Q = sqrtm(Z.T D Z) through x = Q y,
+    without computing the square root or the inverse.
+
+    Both operators act on R^n as in `FairLaplacianOperator' and
+    share the projection. The directions removed by the constraint
+    get the generalized eigenvalue 3, above every Rayleigh quotient
+    x.T L x / x.T D x <= 2 of a graph, so the smallest eigenpairs of
+    the pencil are those of the problem above, with the eigenvectors
+    already multiplied by Z.
+
+    Params:
+        lap_mat (np.ndarray or scipy.sparse matrix): n*n Laplacian.
+        deg_mat (np.ndarray or scipy.sparse matrix): n*n degree
+                                                     matrix.
+        F (np.ndarray or GroupConstraint): n*(h-1) fairness
+                                           constraint matrix.
+
+    Returns:
+        A (FairLaplacianOperator): the operator for Z.T L Z.
+        B (FairLaplacianOperator): the operator for Z.T D Z.
+    """
+    A = FairLaplacianOperator(lap_mat, F, shift=3)
+    B = FairLaplacianOperator(deg_mat, None, shift=1, basis=A.Q)
+    return A, B
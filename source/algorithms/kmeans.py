@@ -0,0 +1,293 @@
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import numpy as np
+
+
+METHODS = ('auto', 'lloyd', 'hamerly', 'minibatch')
+
+# 'auto' uses Hamerly's algorithm from this many clusters on; below
+# it a plain batched Lloyd iteration is cheaper.
+HAMERLY_MIN_K = 16
+
+# 'auto' uses mini-batch k-means from this many points on.
+MINIBATCH_MIN_N = 1000000
+
+# points are assigned to centroids in chunks of this many rows, which
+# bounds the size of the distance matrix.
+CHUNK_SIZE = 65536
+
+
+def kmeans(pts, k, method='auto', max_iter=100, tol=1e-4, seed=None,
+           batch_size=1024, n_init=1, n_jobs=1, backend='thread'):
+    """
+    k-means clustering with k-means++ seeding.
+
+    Params:
+        pts (np.ndarray): an m*d array. Each row is a point in d
+                          dimensional Euclidean space.
+        k (int): the number of clusters.
+        method (str): (optional) one of
+            'lloyd'     -> batched Lloyd iterations,
+            'hamerly'   -> Lloyd iterations skipping the distance
+                           computations ruled out by the triangle
+                           inequality (Hamerly's algorithm),
+            'minibatch' -> mini-batch k-means, followed by one full
+                           assignment step,
+            'auto'      -> chosen from the number of points and k.
+        max_iter (int): (optional) maximum number of iterations.
+        tol (float): (optional) relative tolerance on the movement of
+                     the centroids used to declare convergence.
+        seed (int or np.random.SeedSequence): (optional) seed. Each
+            restart gets its own stream spawned from it, so the result
+            does not depend on n_jobs or backend.
+        batch_size (int): (optional) batch size of 'minibatch'.
+        n_init (int): (optional) number of restarts. The solution with
+                      the lowest inertia is returned.
+        n_jobs (int): (optional) number of restarts run concurrently.
+        backend (str): (optional) 'thread' or 'process' pool.
+
+    Returns:
+        labels (np.ndarray): array of m int32's, the cluster of each
+                             point.
+        centroids (np.ndarray): k*d array of cluster centers.
+        inertia (float): sum of squared distances of the points to
+                         their centroids.
+    """
+    assert method in METHODS, "unknown method: {}".format(method)
+    assert backend in ('thread', 'process'), \
+        "unknown backend: {}".format(backend)
+
+    # k-means is translation invariant; centering keeps the expanded
+    # distance computation in _sq_dists accurate for columns with a
+    # large offset.
+    pts = np.asarray(pts, dtype=np.float64)
+    mean = np.mean(pts, axis=0)
+    pts = pts - mean
+
+    if method == 'auto':
+        if len(pts) >= MINIBATCH_MIN_N:
+            method = 'minibatch'
+        elif k >= HAMERLY_MIN_K:
+            method = 'hamerly'
+        else:
+            method = 'lloyd'
+
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    args = [(pts, k, method, max_iter, tol, batch_size, child)
+            for child in seed.spawn(n_init)]
+
+    if n_jobs == 1 or n_init == 1:
+        results = [_kmeans_single(*a) for a in args]
+    else:
+        Pool = ThreadPoolExecutor if backend == 'thread' \
+            else ProcessPoolExecutor
+        with Pool(max_workers=min(n_jobs, n_init)) as pool:
+            results = list(pool.map(_kmeans_single, *zip(*args)))
+
+    # ties go to the earliest restart.
+    labels, centroids, inertia = min(results, key=lambda r: r[2])
+    return labels, centroids + mean, inertia
+
+
+def _kmeans_single(pts, k, method, max_iter, tol, batch_size, seed_seq):
+    rng = np.random.default_rng(seed_seq)
+
+    # absolute tolerance relative to the spread of the data.
+    tol = tol*np.mean(np.var(pts, axis=0))
+
+    if method == 'minibatch':
+        centroids = _minibatch(pts, k, rng, max_iter, tol, batch_size)
+    else:
+        centroids = kmeans_pp(pts, k, rng)
+        if method == 'lloyd':
+            centroids = _lloyd(pts, centroids, max_iter, tol)
+        else:
+            centroids = _hamerly(pts, centroids, max_iter, tol)
+
+    labels, sq_dists = _assign(pts, centroids)
+    return labels, centroids, float(np.sum(sq_dists))
+
+
+def kmeans_pp(pts, k, rng):
+    """
+    Chooses k initial centroids among the points with the k-means++
+    rule: each new centroid is drawn with probability proportional to
+    the squared distance to the closest centroid chosen so far.
+    """
+    n = len(pts)
+    centroids = np.empty((k, pts.shape[1]))
+    centroids[0] = pts[rng.integers(n)]
+    sq_dists = np.sum((pts - centroids[0])**2, axis=1)
+
+    for i in range(1, k):
+        total = np.sum(sq_dists)
+        if total > 0:
+            idx = rng.choice(n, p=sq_dists/total)
+        else:
+            # fewer distinct points than clusters.
+            idx = rng.integers(n)
+        centroids[i] = pts[idx]
+        sq_dists = np.minimum(sq_dists,
+                              np.sum((pts - centroids[i])**2, axis=1))
+    return centroids
+
+
+def _sq_dists(pts, centroids):
+    """
+    Squared distances between each point and each centroid, computed
+    with one matrix product.
+    """
+    d = (np.sum(pts**2, axis=1)[:, None]
+         - 2*(pts @ centroids.T)
+         + np.sum(centroids**2, axis=1)[None, :])
+    return np.maximum(d, 0)
+
+
+def _assign(pts, centroids):
+    """
+    Returns the closest centroid of each point and the squared
+    distance to it.
+    """
+    n = len(pts)
+    labels = np.empty(n, dtype=np.int32)
+    sq_dists = np.empty(n)
+
+    for start in range(0, n, CHUNK_SIZE):
+        d = _sq_dists(pts[start:start+CHUNK_SIZE], centroids)
+        labels[start:start+CHUNK_SIZE] = np.argmin(d, axis=1)
+        sq_dists[start:start+CHUNK_SIZE] = np.min(d, axis=1)
+    return labels, sq_dists
+
+
+def _centroids(pts, labels, old_centroids, sq_dists):
+    """
+    Means of the clusters. A cluster that lost all its points is moved
+    to the point farthest from its current centroid.
+    """
+    k, dim = old_centroids.shape
+    counts = np.bincount(labels, minlength=k)
+    sums = np.stack([np.bincount(labels, weights=pts[:, j], minlength=k)
+                     for j in range(dim)], axis=1)
+    centroids = old_centroids.copy()
+    nonempty = counts > 0
+    centroids[nonempty] = sums[nonempty]/counts[nonempty, None]
+
+    empty = np.flatnonzero(~nonempty)
+    if len(empty):
+        far = np.argsort(sq_dists)[::-1][:len(empty)]
+        centroids[empty[:len(far)]] = pts[far]
+    return centroids
+
+
+def _lloyd(pts, centroids, max_iter, tol):
+    for _ in range(max_iter):
+        labels, sq_dists = _assign(pts, centroids)
+        new_centroids = _centroids(pts, labels, centroids, sq_dists)
+        shift = np.sum((new_centroids - centroids)**2)
+        centroids = new_centroids
+        if shift <= tol:
+            break
+    return centroids
+
+
+def _hamerly(pts, centroids, max_iter, tol):
+    """
+    Hamerly's algorithm. Each point keeps an upper bound on the
+    distance to its centroid and a lower bound on the distance to any
+    other centroid; distances are only recomputed for the points
+    whose bounds do not prove the assignment is unchanged.
+    """
+    k = len(centroids)
+    if k < 2:
+        return _lloyd(pts, centroids, max_iter, tol)
+
+    labels, upper, lower = _two_closest(pts, centroids)
+
+    for _ in range(max_iter):
+        c_dists = np.sqrt(_sq_dists(centroids, centroids))
+        np.fill_diagonal(c_dists, np.inf)
+        half_sep = np.min(c_dists, axis=1)/2
+
+        bound = np.maximum(half_sep[labels], lower)
+        check = np.flatnonzero(upper > bound)
+        if len(check):
+            # tighten the upper bound first.
+            upper[check] = np.sqrt(np.sum(
+                (pts[check] - centroids[labels[check]])**2, axis=1))
+            check = check[upper[check] > bound[check]]
+
+        if len(check):
+            labels[check], upper[check], lower[check] = \
+                _two_closest(pts[check], centroids)
+
+        new_centroids = _centroids(pts, labels, centroids, upper**2)
+        moves = np.sqrt(np.sum((new_centroids - centroids)**2, axis=1))
+        centroids = new_centroids
+
+        if np.sum(moves**2) <= tol:
+            break
+
+        # update the bounds with the movement of the centroids.
+        order = np.argsort(moves)
+        max_move, second_move = moves[order[-1]], moves[order[-2]]
+        upper += moves[labels]
+        lower -= np.where(labels == order[-1], second_move, max_move)
+
+    return centroids
+
+
+def _two_closest(pts, centroids):
+    """
+    Returns the closest centroid of each point, the distance to it and
+    the distance to the second closest centroid.
+    """
+    n = len(pts)
+    labels = np.empty(n, dtype=np.int32)
+    first = np.empty(n)
+    second = np.empty(n)
+
+    for start in range(0, n, CHUNK_SIZE):
+        chunk = slice(start, start+CHUNK_SIZE)
+        d = _sq_dists(pts[chunk], centroids)
+        part = np.argpartition(d, 1, axis=1)[:, :2]
+        rows = np.arange(len(d))
+        labels[chunk] = part[:, 0]
+        first[chunk] = d[rows, part[:, 0]]
+        second[chunk] = d[rows, part[:, 1]]
+    return labels, np.sqrt(first), np.sqrt(second)
+
+
+def _minibatch(pts, k, rng, max_iter, tol, batch_size):
+    """
+    Mini-batch k-means (Sculley, 2010). The centroids are seeded with
+    k-means++ on a sample and updated from random batches with
+    per-centroid learning rates.
+    """
+    n = len(pts)
+    sample = rng.choice(n, size=min(n, max(10*k, 3*batch_size)),
+                        replace=False)
+    centroids = kmeans_pp(pts[sample], k, rng)
+    counts = np.zeros(k)
+
+    for _ in range(max_iter):
+        batch = pts[rng.integers(n, size=batch_size)]
+        labels, _ = _assign(batch, centroids)
+
+        batch_counts = np.bincount(labels, minlength=k)
+        sums = np.stack([np.bincount(labels, weights=batch[:, j],
+                                     minlength=k)
+                         for j in range(pts.shape[1])], axis=1)
+        counts += batch_counts
+        hit = batch_counts > 0
+        # centroid <- centroid + (batch mean - centroid)*|batch|/count
+        rate = (batch_counts[hit]/counts[hit])[:, None]
+        new_centroids = centroids.copy()
+        new_centroids[hit] += rate*(sums[hit]/batch_counts[hit, None]
+                                    - centroids[hit])
+
+        shift = np.sum((new_centroids - centroids)**2)
+        centroids = new_centroids
+        if shift <= tol:
+            break
+    return centroids
@@ -0,0 +1,211 @@
+import os
+
+from . import eigensolvers as es
+
+
+# the ways a clustering function can run:
+#   'dense'       -> dense adjacency and Laplacian arrays,
+#   'sparse'      -> CSR adjacency and Laplacian (sparse=True),
+#   'matrix_free' -> CSR adjacency, Laplacian applied through it
+#                    (matrix_free=True).
+PATHS = ('dense', 'sparse', 'matrix_free')
+
+# assumed speed of the machine, in floating point operations per
+# second, for the runtime estimates.
+FLOPS = 1e10
+
+# bytes per stored entry of a CSR matrix (float64 value, int32 index).
+CSR_ENTRY = 12
+
+# peak bytes per edge while the CSR adjacency and Laplacian are built
+# from the list of edges (the COO arrays and the sort are temporary).
+BUILD_PER_EDGE = 60
+
+# n*m blocks kept by LOBPCG (X, AX, BX, the residuals, the search
+# directions and their products).
+LOBPCG_BLOCKS = 15
+
+# typical number of LOBPCG iterations on these problems.
+LOBPCG_ITERATIONS = 100
+
+
+def estimate(n, num_edges, m, h=0, normalized=False, flops=FLOPS):
+    """
+    Estimates the peak memory and the runtime of a clustering function
+    on each of PATHS, before anything is allocated.
+
+    The model follows the code: the matrices each path builds and the
+    eigensolver `eigensolvers.choose_solver' picks for them (dense
+    LAPACK or LOBPCG), with its workspace. The
+    memory is accurate to tens of percent; the runtime is an order of
+    magnitude, from operation counts at `flops'.
+
+    Params:
+        n (int): the number of nodes.
+        num_edges (int): the number of non-zeros of the adjacency
+                         matrix (each undirected edge counts twice).
+        m (int): the number of eigenvectors computed (k+1 for the
+                 functions taking edges, k for the others).
+        h (int): (optional) the number of groups, 0 without fairness
+                 constraint.
+        normalized (bool): (optional) normalized spectral clustering.
+        flops (float): (optional) speed of the machine.
+
+    Returns:
+        estimates (dict): path -> {'memory': bytes, 'time': seconds,
+                                   'solver': eigensolver used}.
+    """
+    constrained = h > 0
+    nnz = num_edges + n  # of the Laplacian
+    estimates = {}
+
+    for path in PATHS:
+        if path == 'dense':
+            build_peak = 3*8*n*n  # adjacency, degree matrix, Laplacian
+            resident = 8*n*n*(2 + (constrained and normalized))
+            kind = 'array'
+        elif path == 'sparse':
+            build_peak = BUILD_PER_EDGE*num_edges + 8*n
+            resident = CSR_ENTRY*(num_edges + nnz) + 16*n
+            kind = 'csr'
+        else:
+            build_peak = BUILD_PER_EDGE*num_edges + 8*n
+            resident = CSR_ENTRY*num_edges + 16*n
+            kind = 'operator'
+
+        if constrained:
+            # the fair Laplacian (and the pencil) are linear operators.
+            resident += 8*n*(h + 2)
+            kind = 'operator'
+
+        solver, eig_memory, eig_flops = _eigensolver_cost(
+            n, nnz, m, kind, path == 'dense', constrained, normalized
+        )
+        # k-means (n_init=10, up to 100 iterations).
+        kmeans_flops = 3*10*100*n*m*m
+        # the n*n arrays of the dense path are written and scanned a
+        # few times, at the speed of memory rather than of arithmetic.
+        build_flops = 30*n*n if path == 'dense' else 10*num_edges
+
+        estimates[path] = {
+            'memory': int(max(build_peak, resident + eig_memory)),
+            'time': (eig_flops + kmeans_flops + build_flops)/flops,
+            'solver': solver,
+        }
+
+    return estimates
+
+
+def _eigensolver_cost(n, nnz, m, kind, dense, constrained, normalized):
+    """
+    The solver `choose_solver' picks for the matrix of the given kind,
+    with its memory (bytes) and floating point operations.
+    """
+    if n <= es.DENSE_MAX_N or m >= n - 1 or n < 5*m:
+        solver = 'dense'
+    elif kind != 'operator' and dense and nnz >= es.SPARSE_MAX_DENSITY*n*n:
+        solver = 'dense'
+    else:
+        solver = 'lobpcg'
+
+    # cost of one product of the matrix with a vector. A dense Laplacian
+    # given to LOBPCG is converted to CSR first.
+    converted = solver == 'lobpcg' and dense and kind != 'operator'
+    matvec = 2*(n*n if dense and not converted else nnz) \
+        + (4*n*m if constrained else 0)
+
+    if solver == 'dense':
+        # the matrix is materialized (as the product with I for an
+        # operator, the projections needing two more n*n temporaries)
+        # and copied by eigh, and so is B of the normalized constrained
+        # problem.
+        copies = 1 + (not dense or kind == 'operator') \
+            + (kind == 'operator') + 2*constrained \
+            + (constrained and normalized)
+        flops = 4/3*n**3 + (n*matvec if kind == 'operator' else 0)
+        return solver, 8*n*n*copies, flops
+
+    # the normalized constrained problem also applies B.
+    flops = LOBPCG_ITERATIONS*(m*matvec*(1 + (constrained and normalized))
+                               + 30*n*m*m)
+    return solver, 8*n*m*LOBPCG_BLOCKS + CSR_ENTRY*nnz*converted, flops
+
+
+def available_memory():
+    """
+    The physical memory currently available, in bytes (None if the
+    system does not tell).
+    """
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES')*os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def plan(n, num_edges, m, h=0, normalized=False, memory_budget=None,
+         paths=PATHS, flops=FLOPS):
+    """
+    Chooses the fastest path (by `estimate') whose peak memory fits in
+    the budget, the smallest one on ties, or fails before anything is
+    allocated.
+
+    Params:
+        n, num_edges, m, h, normalized, flops: see `estimate'.
+        memory_budget (int or str): (optional) bytes available, or
+                                    'auto' for the physical memory
+                                    currently available. No limit by
+                                    default.
+        paths (tuple): (optional) the paths to choose from.
+
+    Returns:
+        path (str): one of PATHS.
+        estimates (dict): see `estimate'.
+
+    Warnings:
+        Raises MemoryError, with the estimates, if no path fits in the
+        budget. Unlike the argument checks this is not an assert, so
+        it also runs under python -O.
+    """
+    if memory_budget == 'auto':
+        memory_budget = available_memory()
+
+    estimates = estimate(n, num_edges, m, h, normalized, flops)
+    fitting = [path for path in paths
+               if memory_budget is None
+               or estimates[path]['memory'] <= memory_budget]
+
+    if not fitting:
+        raise MemoryError(
+            "no way to cluster {} nodes and {} edges within {}:\n{}".format(
+                n, num_edges, _format_bytes(memory_budget),
+                format_estimates(estimates, paths)
+            )
+        )
+
+    path = min(fitting, key=lambda path: (estimates[path]['time'],
+                                          estimates[path]['memory']))
+    return path, estimates
+
+
+def format_estimates(estimates, paths=PATHS):
+    """
+    The estimates as a table, one line per path.
+    """
+    return '\n'.join(
+        '    {:<12} {:>10} {:>12}  ({})'.format(
+            path, _format_bytes(estimates[path]['memory']),
+            '~{:.2g} s'.format(estimates[path]['time']),
+            estimates[path]['solver']
+        )
+        for path in paths
+    )
+
+
+def _format_bytes(size):
+    if size is None:
+        return 'unknown'
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            return '{:.1f} {}'.format(size, unit)
+        size /= 1024
+    return '{:.1f} TB'.format(size)
@@ -0,0 +1,146 @@
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+import scipy.sparse as sp
+
+
+# the stages of the clustering functions, in order.
+STAGES = ('adjacency', 'laplacian', 'fairness', 'operator', 'eigensolver',
+          'kmeans')
+
+
+class Profiler:
+    """
+    Collects the wall time, and optionally the peak memory, of each
+    stage of a clustering function, with the size of what the stage
+    produced. Pass it as `profiler' to the functions of
+    `spectral_clustering':
+
+        prof = Profiler(memory=True)
+        normalizedConSC(n, k, edges, groups, profiler=prof)
+        print(prof.summary())
+
+    Each measurement is a dict
+        {'stage': name, 'time': seconds, 'peak_mem': bytes,
+         'output': sizes of the result}
+    appended to `records' and passed to callback, if given (e.g. to
+    forward it to a monitoring system). A plain function given as
+    profiler is used as such a callback.
+
+    Params:
+        callback (function): (optional) called with every record.
+        memory (bool): (optional) measure the peak memory of each stage
+                       with tracemalloc (started if it is not already
+                       running, else its peak is reset at each stage).
+                       It only sees memory allocated through python
+                       and numpy, and slows the stages down.
+    """
+
+    def __init__(self, callback=None, memory=False):
+        self.callback = callback
+        self.memory = memory
+        self.records = []
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Measures the block it wraps. Yields the record, so the block
+        can add entries to it.
+        """
+        record = {'stage': name}
+        started = False
+        if self.memory:
+            started = not tracemalloc.is_tracing()
+            if started:
+                tracemalloc.start()
+            else:
+                tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['time'] = time.perf_counter() - start
+            if self.memory:
+                record['peak_mem'] = tracemalloc.get_traced_memory()[1] - base
+                if started:
+                    tracemalloc.stop()
+
+        self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def total(self, key='time'):
+        """
+        Sum of `key' over the records, by stage.
+        """
+        totals = {}
+        for record in self.records:
+            totals[record['stage']] = \
+                totals.get(record['stage'], 0) + record.get(key, 0)
+        return totals
+
+    def summary(self):
+        """
+        The records as a table, one line per stage run.
+        """
+        lines = ['{:<12} {:>10} {:>12}  {}'.format(
+            'stage', 'time (s)', 'peak (MB)', 'output')]
+        for record in self.records:
+            peak = record.get('peak_mem')
+            lines.append('{:<12} {:>10.4f} {:>12}  {}'.format(
+                record['stage'], record['time'],
+                '-' if peak is None else '{:.1f}'.format(peak/2**20),
+                record.get('output', '')
+            ))
+        return '\n'.join(lines)
+
+
+def profiled(profiler, name, func, *args, **kwargs):
+    """
+    Returns func(*args, **kwargs), measured as stage `name' by
+    profiler. Without a profiler this is just the call.
+    """
+    if profiler is None:
+        return func(*args, **kwargs)
+
+    if not isinstance(profiler, Profiler):
+        profiler = Profiler(profiler)
+
+    with profiler.stage(name) as record:
+        result = func(*args, **kwargs)
+        record['output'] = describe(result)
+    return result
+
+
+def describe(x):
+    """
+    Sizes of a matrix (shape, nnz, bytes) or of the matrices in a
+    tuple, for the records.
+    """
+    if isinstance(x, tuple):
+        return [describe(item) for item in x]
+
+    if x is None:
+        return None
+
+    if sp.issparse(x):
+        return {'shape': list(x.shape), 'nnz': int(x.nnz),
+                'nbytes': int(sum(getattr(x, a).nbytes
+                                  for a in ('data', 'indices', 'indptr')
+                                  if hasattr(x, a)))}
+
+    if isinstance(x, np.ndarray):
+        return {'shape': list(x.shape), 'nbytes': int(x.nbytes)}
+
+    if isinstance(x, list):
+        return {'len': len(x)}
+
+    if hasattr(x, 'shape'):
+        # implicit operators
+        return {'shape': list(x.shape), 'type': type(x).__name__}
+
+    return {'type': type(x).__name__}
@@ -1,9 +1,16 @@
 import numpy as np
-from scipy.cluster import vq as cl
-from scipy.linalg import null_space, sqrtm
+import scipy.sparse as sp
 
+from .eigensolvers import smallest_eigh
+from .fair_operator import (FairLaplacianOperator, GroupConstraint,
+                            LaplacianOperator, fair_generalized_pencil)
+from .kmeans import kmeans
+from .planner import PATHS, plan
+from .profiling import profiled
 
-def kMM(k, pts):
+
+def kMM(k, pts, method='auto', seed=None, n_init=10, n_jobs=1,
+        return_labels=False):
     """
     Performs k-means clustering on dataset
 
@@ -11,27 +18,61 @@ def kMM(k, pts):
         k (int): the number of clusters
         pts (np.ndarray): an m*n array. Each row is a point in
                           n dimensional Euclidean space.
+        method (str): (optional) k-means algorithm, see
+                      `kmeans.kmeans'.
+        seed (int): (optional) seed of the k-means restarts.
+        n_init (int): (optional) number of k-means restarts, the
+                      partition with the lowest inertia is kept.
+        n_jobs (int): (optional) number of restarts run in parallel.
+        return_labels (bool): (optional) return the labels instead of
+                              the list of clusters.
 
     Returns:
         clusters (list): List of k lists. Each element of the list
                          is another list which contains the indices
                          of the points in the cluster.
+        or
+        labels (np.ndarray): array of m int32's, the cluster of each
+                             point (if return_labels).
     """
-    clusters = [[] for i in range(k)]
-    w_pts = cl.whiten(pts)
-    centroids = cl.kmeans(w_pts, k, iter=100)[0]
-
-    for i, p in enumerate(w_pts):
-        dists = []
-        dists = np.array([
-            np.linalg.norm(p-center) for center in centroids
-        ])
-        cl_id = np.argmin(dists)
-        clusters[cl_id].append(i)
-    return clusters
+    w_pts = _whiten(pts)
+    labels, centroids, inertia = kmeans(w_pts, k, method=method, seed=seed,
+                                        n_init=n_init, n_jobs=n_jobs)
+
+    if return_labels:
+        return labels
+    return _get_clusters(labels, k)
+
+
+def _whiten(pts):
+    """
+    Scales each column to unit standard deviation, like
+    scipy.cluster.vq.whiten. Columns that are constant up to rounding
+    (e.g. the first eigenvector of a connected graph) are left as they
+    are instead of blowing up their rounding noise.
+    """
+    pts = np.asarray(pts, dtype=np.float64)
+    std = np.std(pts, axis=0)
+    scale = np.max(np.abs(pts), axis=0)
+    flat = std <= 1e-8*scale
+    std[flat] = 1
+    return pts/std
+
 
+def _get_clusters(labels, k):
+    """
+    Converts an array of cluster labels to a list of k lists of
+    indices, in increasing order within each cluster.
+    """
+    order = np.argsort(labels, kind='stable')
+    bounds = np.cumsum(np.bincount(labels, minlength=k))[:-1]
+    return [c.tolist() for c in np.split(order, bounds)]
+
+
+def _get_adj_mat(n, edges, sparse=False):
+    if sparse:
+        return _get_sparse_adj_mat(n, edges)
 
-def _get_adj_mat(n, edges):
     adj_mat = np.zeros((n, n))
     adj_mat = (adj_mat + adj_mat.T)/2
 
@@ -42,208 +83,266 @@ def _get_adj_mat(n, edges):
     return adj_mat
 
 
-def _get_lap_mat(adj_mat):
-    deg_mat = np.diag(np.sum(adj_mat, axis=0))
-    lap_mat = deg_mat - adj_mat
-    return lap_mat
-
-
-def unnormalizedSC(n, k, edges):
+def _get_sparse_adj_mat(n, edges):
     """
-    Performs unnormalized Spectral clustering
+    Builds the adjacency matrix in CSR format from the list of edges
+    in one step. Like the dense version, an entry is 1 if the edge
+    appears (any number of times) in `edges' and 0 otherwise.
 
     Params:
         n (int): the number of nodes in the graph.
-        k (int): the number of clusters required.
         edges (np.ndarray): |E|*2 matrix with each row representing
                             an edge.
 
     Returns:
-        clusters (list): a list whose element are list of labels of
-                         nodes belonging to the same cluster.
-
+        adj_mat (scipy.sparse.csr_matrix): n*n adjacency matrix.
     """
-    adj_mat = _get_adj_mat(n, edges)
-    lap_mat = _get_lap_mat(adj_mat)
-
-    w, v = np.linalg.eigh(lap_mat)
-    vecs = v[:, :k+1]
+    edges = np.asarray(edges).reshape(-1, 2).astype(np.int64)
+    data = np.ones(len(edges))
+    adj_mat = sp.csr_matrix((data, (edges[:, 0], edges[:, 1])),
+                            shape=(n, n))
+    adj_mat.data[:] = 1 # duplicate edges are summed by the constructor
+    return adj_mat
 
-    clusters = kMM(k, vecs)
 
-    return clusters
+def _get_deg(adj_mat):
+    return np.asarray(adj_mat.sum(axis=0), dtype=np.float64).reshape(-1)
 
 
-def normalizedSC(n, k, edges):
+def _get_deg_mat(deg, adj_mat):
     """
-    Performs normalized Spectral clustering
-
-    Params:
-        n (int): the number of nodes in the graph.
-        k (int): the number of clusters required.
-        edges (np.ndarray): |E|*2 matrix with each row representing
-                            an edge.
-
-    Returns:
-        clusters (list): a list whose element are list of labels of
-                         nodes belonging to the same cluster.
-
-    Warnings:
-        Might throw a warning when there are isolated edges
+    Diagonal matrix with entries `deg', stored in the same format
+    (dense or sparse) as `adj_mat'.
     """
-    adj_mat = _get_adj_mat(n, edges)
-    lap_mat = _get_lap_mat(adj_mat)
+    if sp.issparse(adj_mat):
+        return sp.diags(deg, format='csr')
+    return np.diag(deg)
 
-    deg_mat = np.sum(adj_mat, axis=0)
-    deg_inv_half = np.diag(1/np.sqrt(deg_mat))
-    norm_lap_mat = deg_inv_half@(lap_mat @ deg_inv_half)
-    w, v = np.linalg.eigh(lap_mat)
-    vecs = v[:, :k+1]
-    clusters = kMM(k, vecs)
 
-    return clusters
+def _get_lap_mat(adj_mat, matrix_free=False):
+    if matrix_free:
+        return LaplacianOperator(adj_mat, _get_deg(adj_mat))
 
+    deg_mat = _get_deg_mat(_get_deg(adj_mat), adj_mat)
+    lap_mat = deg_mat - adj_mat
+    if sp.issparse(lap_mat):
+        lap_mat = lap_mat.tocsr()
+    return lap_mat
 
-def unnormalizedConSC(n, k, edges, groups):
+
+def _get_fair_mat(n, groups):
     """
-    Performs unnormalized spectral clustering with population fairness
-    constraint.
+    Builds the n*(h-1) fairness constraint matrix F in implicit form.
+    The ith column is the indicator vector of the ith group minus the
+    proportion of the group in the graph; the last group is left out.
 
     Params:
-        n (int): the number of vertices in the graph.
-        k (int): the number of clusters required.
-        edges (np.ndarray): |E|*2 matrix with each row representing
-                            an edge.
-        groups (list): list of lists. Each list is a collection
-                       of nodes forming a group.
+        n (int): the number of nodes.
+        groups (list or np.ndarray): list of lists of nodes forming
+                                     the groups, or array of the group
+                                     of each node (-1 for none).
 
     Returns:
-        clusters (list): list of lists. Each list is the collection
-                         of nodes forming the cluster.
+        F (GroupConstraint): the sparse indicator of the first h-1
+                             groups and their proportions.
     """
-    adj_mat = _get_adj_mat(n, edges)
-    lap_mat = _get_lap_mat(adj_mat)
+    if isinstance(groups, np.ndarray) and groups.ndim == 1:
+        labels = groups.astype(np.int64)
+        sizes = np.bincount(labels[labels >= 0])
+        h = len(sizes)
+        members = np.flatnonzero((labels >= 0) & (labels < h-1))
+        cols = labels[members]
+    else:
+        sizes = np.array([len(group) for group in groups], dtype=np.int64)
+        h = len(sizes)
+        members = np.concatenate(
+            [np.asarray(group, dtype=np.int64).reshape(-1)
+             for group in groups[:-1]] + [np.zeros(0, np.int64)]
+        )
+        cols = np.repeat(np.arange(h-1), sizes[:-1])
+
+    # jth vertex in ith group
+    indicator = sp.csr_matrix((np.ones(len(members)), (members, cols)),
+                              shape=(n, h-1))
+    indicator.data[:] = 1 # a node listed twice is still one member
+
+    return GroupConstraint(indicator, sizes[:-1]/n)
+
+
+def _get_operators(adj_mat, groups=None, normalized=False,
+                   matrix_free=False, profiler=None):
+    """
+    Builds the (generalized) eigenproblem whose smallest eigenvectors
+    are clustered, i.e. the pair (A, B) with A @ H = B @ H @ diag(w).
 
-    h = len(groups)
-    f_mat = np.zeros((n, h)) # each col represents group
+    Params:
+        adj_mat (np.ndarray or scipy.sparse matrix): n*n adjacency
+                                                     matrix.
+        groups (list or np.ndarray): (optional) list of lists of nodes
+                                     forming the groups of the fairness
+                                     constraint, or array of the group
+                                     of each node.
+        normalized (bool): (optional) normalized spectral clustering.
+        matrix_free (bool): (optional) apply the Laplacian through
+                            `adj_mat' instead of assembling it.
+        profiler (profiling.Profiler): (optional) measures the
+                                       'laplacian', 'fairness' and
+                                       'operator' stages.
 
-    for i  in range(h):
-        for j in groups[i]:
-            f_mat[j][i] = 1 # jth vertex in ith group
+    Returns:
+        A (np.ndarray, scipy.sparse matrix or LinearOperator): n*n
+            symmetric matrix.
+        B (LinearOperator): n*n positive definite matrix, or None for
+                            a standard eigenproblem.
+    """
+    n = adj_mat.shape[0]
+    lap_mat = profiled(profiler, 'laplacian', _get_lap_mat, adj_mat,
+                       matrix_free)
 
-    vs_by_n = np.array(list(map(lambda x: len(x)/n, groups))).reshape((1,h))
-    F = f_mat - vs_by_n
-    F = F[:, :-1] # all except the last column.
+    if groups is None:
+        # normalizedSC clusters the eigenvectors of lap_mat as well.
+        return lap_mat, None
 
-    Z = null_space(F.T)
+    F = profiled(profiler, 'fairness', _get_fair_mat, n, groups)
 
-    new_lap_mat = Z.T @ (lap_mat @ Z)
-    w,v = np.linalg.eigh(new_lap_mat)
-    Y = v[:, :k+1]
-    H = Z @ Y
-    clusters = kMM(k, H)
+    if not normalized:
+        # the eigenvectors of the operator are already H = Z @ Y
+        return profiled(profiler, 'operator', FairLaplacianOperator,
+                        lap_mat, F), None
 
-    return clusters
+    def pencil():
+        if matrix_free:
+            deg_mat = sp.diags(lap_mat.deg, format='csr')
+        else:
+            deg_mat = _get_deg_mat(_get_deg(adj_mat), adj_mat)
 
+        ## calculations from the paper ##
+        # Q^-1 (Z.T L Z) Q^-1 x = w x with Q = sqrtm(Z.T D Z) is solved
+        # as (Z.T L Z) y = w (Z.T D Z) y, y = Q^-1 x. The eigenvectors
+        # of the pencil are already H = Z @ (Q^-1 @ X).
+        return fair_generalized_pencil(lap_mat, deg_mat, F)
 
+    return profiled(profiler, 'operator', pencil)
 
-def normalizedConSC(n, k, edges, groups):
-    """
-    Performs normalized spectral clustering with population fairness
-    constraint.
 
-    Params:
-        n (int): the number of vertices in the graph.
-        k (int): the number of clusters required.
-        edges (np.ndarray): |E|*2 matrix with each row representing
-                            an edge.
-        groups (list): list of lists. Each list is a collection
-                       of nodes forming a group.
+def _num_groups(groups):
+    if isinstance(groups, np.ndarray) and groups.ndim == 1:
+        return int(np.max(groups, initial=-1)) + 1
+    return len(groups)
 
-    Returns:
-        clusters (list): list of lists. Each list is the collection
-                         of nodes forming the cluster.
 
-    Warnings:
-        Shows error if there are isolated vertices.
+def _choose_path(n, m, num_edges, groups, normalized, memory_budget,
+                 sparse=False, matrix_free=False, paths=PATHS):
     """
-    adj_mat = _get_adj_mat(n, edges)
-    lap_mat = _get_lap_mat(adj_mat)
-
-    h = len(groups)
-
-    f_mat = np.zeros((n, h)) # each col represents group
-
-    for i  in range(h):
-        for j in groups[i]:
-            f_mat[j][i] = 1 # jth vertex in ith group
-
-    vs_by_n = np.array(list(map(lambda x: len(x)/n, groups))).reshape((1,h))
-    F = f_mat - vs_by_n
-    F = F[:, :-1] # all except the last column.
-
-    Z = null_space(F.T)
-
-    ## calculations from the paper ##
-    deg_mat = np.diag(np.sum(adj_mat, axis=0))
-    Q2 = Z.T @ (deg_mat @ Z)
-    Q = sqrtm(Q2)
-    Q_inv = np.linalg.inv(Q)
+    The (sparse, matrix_free) flags to run with: as given without a
+    memory budget, else those of the path chosen by `planner.plan'.
+    """
+    if memory_budget is None:
+        return sparse, matrix_free
 
-    unorm_lap = Z.T @ (lap_mat @ Z)
-    new_lap_mat = Q_inv @ (unorm_lap @ Q_inv)
-    w, v = np.linalg.eigh(new_lap_mat)
-    X = v[:, :k+1]
-    H = Z @ (Q_inv @ X)
-    clusters = kMM(k, H)
+    h = 0 if groups is None else _num_groups(groups)
+    path, _ = plan(n, num_edges, m, h, normalized, memory_budget, paths)
+    return path != 'dense', path == 'matrix_free'
 
-    return clusters
 
+def _planned_adj_mat(adj_mat, m, groups, normalized, memory_budget,
+                     matrix_free):
+    """
+    `_choose_path' for the functions taking the adjacency matrix: a
+    dense adj_mat is converted to CSR if a sparse path is chosen.
+    """
+    if memory_budget is None:
+        return adj_mat, matrix_free
 
+    if sp.issparse(adj_mat):
+        num_edges, paths = adj_mat.nnz, PATHS[1:]
+    else:
+        num_edges, paths = np.count_nonzero(adj_mat), PATHS
 
-"""
-The _<clustering function> perform the same task as
-<clustering function> without underscore, but takes
-adjacency matrix instead of list of edges.
+    sparse, matrix_free = _choose_path(
+        adj_mat.shape[0], m, num_edges, groups, normalized, memory_budget,
+        paths=paths
+    )
+    if sparse and not sp.issparse(adj_mat):
+        adj_mat = sp.csr_matrix(adj_mat)
+    return adj_mat, matrix_free
 
-_unnormalizedSC
-_normalizedSC
-_unnormalizedConSC
-_normalizedConSC
-"""
 
-def _unnormalizedSC(n, k, adj_mat):
+def unnormalizedSC(n, k, edges, sparse=False, solver='auto', seed=None,
+                   return_labels=False, profiler=None, memory_budget=None):
     """
     Performs unnormalized Spectral clustering
 
     Params:
         n (int): the number of nodes in the graph.
         k (int): the number of clusters required.
-        adj_mat (np.ndarray): n*n adjacency matrix.
+        edges (np.ndarray): |E|*2 matrix with each row representing
+                            an edge.
+        sparse (bool): (optional) build the adjacency and Laplacian
+                       matrices in CSR format instead of dense arrays.
+        solver (str): (optional) eigensolver, see
+                      `eigensolvers.smallest_eigh'.
+        seed (int): (optional) seed of the random number generators,
+                    makes the clustering reproducible.
+        return_labels (bool): (optional) return an int32 array with
+                              the cluster of each node instead of
+                              the list of clusters.
+        profiler (profiling.Profiler or function): (optional)
+            measures the time, memory and output sizes of each stage,
+            see `profiling.Profiler'.
+        memory_budget (int or str): (optional) bytes the run may use,
+            or 'auto' for the memory available. The fastest of the
+            dense, sparse and matrix-free paths estimated to fit is
+            used instead of `sparse', and the function fails before
+            allocating anything if none fits, see `planner.plan'.
 
     Returns:
         clusters (list): a list whose element are list of labels of
                          nodes belonging to the same cluster.
 
     """
-    lap_mat = _get_lap_mat(adj_mat)
-
-    w, v = np.linalg.eigh(lap_mat)
-    vecs = v[:, :k+1]
-
-    clusters = kMM(k, vecs)
+    sparse, matrix_free = _choose_path(n, k+1, len(edges), None, False,
+                                       memory_budget, sparse)
+    adj_mat = profiled(profiler, 'adjacency', _get_adj_mat, n, edges,
+                       sparse)
+    mat, B = _get_operators(adj_mat, matrix_free=matrix_free,
+                            profiler=profiler)
+
+    w, H = profiled(profiler, 'eigensolver', smallest_eigh, mat, k+1,
+                    solver, seed=seed, B=B)
+    clusters = profiled(profiler, 'kmeans', kMM, k, H, seed=seed,
+                        return_labels=return_labels)
 
     return clusters
 
 
-def _normalizedSC(n, k, adj_mat):
+def normalizedSC(n, k, edges, sparse=False, solver='auto', seed=None,
+                 return_labels=False, profiler=None, memory_budget=None):
     """
     Performs normalized Spectral clustering
 
     Params:
         n (int): the number of nodes in the graph.
         k (int): the number of clusters required.
-        adj_mat (np.ndarray): n*n adjacency matrix.
+        edges (np.ndarray): |E|*2 matrix with each row representing
+                            an edge.
+        sparse (bool): (optional) build the adjacency and Laplacian
+                       matrices in CSR format instead of dense arrays.
+        solver (str): (optional) eigensolver, see
+                      `eigensolvers.smallest_eigh'.
+        seed (int): (optional) seed of the random number generators,
+                    makes the clustering reproducible.
+        return_labels (bool): (optional) return an int32 array with
+                              the cluster of each node instead of
+                              the list of clusters.
+        profiler (profiling.Profiler or function): (optional)
+            measures the time, memory and output sizes of each stage,
+            see `profiling.Profiler'.
+        memory_budget (int or str): (optional) bytes the run may use,
+            or 'auto' for the memory available. The fastest of the
+            dense, sparse and matrix-free paths estimated to fit is
+            used instead of `sparse', and the function fails before
+            allocating anything if none fits, see `planner.plan'.
 
     Returns:
         clusters (list): a list whose element are list of labels of
@@ -252,19 +351,24 @@ def _normalizedSC(n, k, adj_mat):
     Warnings:
         Might throw a warning when there are isolated edges
     """
-    lap_mat = _get_lap_mat(adj_mat)
-
-    deg_mat = np.sum(adj_mat, axis=0)
-    deg_inv_half = np.diag(1/np.sqrt(deg_mat))
-    norm_lap_mat = deg_inv_half@(lap_mat @ deg_inv_half)
-    w, v = np.linalg.eigh(lap_mat)
-    vecs = v[:, :k+1]
-    clusters = kMM(k, vecs)
+    sparse, matrix_free = _choose_path(n, k+1, len(edges), None, True,
+                                       memory_budget, sparse)
+    adj_mat = profiled(profiler, 'adjacency', _get_adj_mat, n, edges,
+                       sparse)
+    mat, B = _get_operators(adj_mat, normalized=True,
+                            matrix_free=matrix_free, profiler=profiler)
+
+    w, H = profiled(profiler, 'eigensolver', smallest_eigh, mat, k+1,
+                    solver, seed=seed, B=B)
+    clusters = profiled(profiler, 'kmeans', kMM, k, H, seed=seed,
+                        return_labels=return_labels)
 
     return clusters
 
 
-def _unnormalizedConSC(n, k, adj_mat, groups):
+def unnormalizedConSC(n, k, edges, groups, sparse=False, solver='auto',
+                      seed=None, return_labels=False, profiler=None,
+                      memory_budget=None):
     """
     Performs unnormalized spectral clustering with population fairness
     constraint.
@@ -272,40 +376,53 @@ def _unnormalizedConSC(n, k, adj_mat, groups):
     Params:
         n (int): the number of vertices in the graph.
         k (int): the number of clusters required.
-        adj_mat (np.ndarray): n*n adjacency matrix.
-        groups (list): list of lists. Each list is a collection
-                       of nodes forming a group.
+        edges (np.ndarray): |E|*2 matrix with each row representing
+                            an edge.
+        groups (list or np.ndarray): list of lists. Each list is a
+                                     collection of nodes forming a
+                                     group. Or an array with the
+                                     group of each node.
+        sparse (bool): (optional) build the adjacency and Laplacian
+                       matrices in CSR format instead of dense arrays.
+        solver (str): (optional) eigensolver, see
+                      `eigensolvers.smallest_eigh'.
+        seed (int): (optional) seed of the random number generators,
+                    makes the clustering reproducible.
+        return_labels (bool): (optional) return an int32 array with
+                              the cluster of each node instead of
+                              the list of clusters.
+        profiler (profiling.Profiler or function): (optional)
+            measures the time, memory and output sizes of each stage,
+            see `profiling.Profiler'.
+        memory_budget (int or str): (optional) bytes the run may use,
+            or 'auto' for the memory available. The fastest of the
+            dense, sparse and matrix-free paths estimated to fit is
+            used instead of `sparse', and the function fails before
+            allocating anything if none fits, see `planner.plan'.
 
     Returns:
         clusters (list): list of lists. Each list is the collection
                          of nodes forming the cluster.
     """
-    lap_mat = _get_lap_mat(adj_mat)
-
-    h = len(groups)
-    f_mat = np.zeros((n, h)) # each col represents group
-
-    for i  in range(h):
-        for j in groups[i]:
-            f_mat[j][i] = 1 # jth vertex in ith group
-
-    vs_by_n = np.array(list(map(lambda x: len(x)/n, groups))).reshape((1,h))
-    F = f_mat - vs_by_n
-    F = F[:, :-1] # all except the last column.
-
-    Z = null_space(F.T)
-
-    new_lap_mat = Z.T @ (lap_mat @ Z)
-    w,v = np.linalg.eigh(new_lap_mat)
-    Y = v[:, :k+1]
-    H = Z @ Y
-    clusters = kMM(k, H)
+    sparse, matrix_free = _choose_path(n, k+1, len(edges), groups, False,
+                                       memory_budget, sparse)
+    adj_mat = profiled(profiler, 'adjacency', _get_adj_mat, n, edges,
+                       sparse)
+    mat, B = _get_operators(adj_mat, groups, matrix_free=matrix_free,
+                            profiler=profiler)
+
+    w, H = profiled(profiler, 'eigensolver', smallest_eigh, mat, k+1,
+                    solver, seed=seed, B=B)
+    clusters = profiled(profiler, 'kmeans', kMM, k, H, seed=seed,
+                        return_labels=return_labels)
 
     return clusters
 
 
 
-def _normalizedConSC(n, k, adj_mat, groups):
+def normalizedConSC(n, k, edges, groups, sparse=False, solver='auto',
+                    seed=None, return_labels=False, profiler=None,
+                    memory_budget=None):
     """
     Performs normalized spectral clustering with population fairness
     constraint.
@@ -313,9 +430,29 @@ def _normalizedConSC(n, k, adj_mat, groups):
     Params:
         n (int): the number of vertices in the graph.
         k (int): the number of clusters required.
-        adj_mat (np.ndarray): n*n adjacency matrix.
-        groups (list): list of lists. Each list is a collection
-                       of nodes forming a group.
+        edges (np.ndarray): |E|*2 matrix with each row representing
+                            an edge.
+        groups (list or np.ndarray): list of lists. Each list is a
+                                     collection of nodes forming a
+                                     group. Or an array with the
+                                     group of each node.
+        sparse (bool): (optional) build the adjacency and Laplacian
+                       matrices in CSR format instead of dense arrays.
+        solver (str): (optional) eigensolver, see
+                      `eigensolvers.smallest_eigh'.
+        seed (int): (optional) seed of the random number generators,
+                    makes the clustering reproducible.
+        return_labels (bool): (optional) return an int32 array with
+                              the cluster of each node instead of
+                              the list of clusters.
+        profiler (profiling.Profiler or function): (optional)
+            measures the time, memory and output sizes of each stage,
+            see `profiling.Profiler'.
+        memory_budget (int or str): (optional) bytes the run may use,
+            or 'auto' for the memory available. The fastest of the
+            dense, sparse and matrix-free paths estimated to fit is
+            used instead of `sparse', and the function fails before
+            allocating anything if none fits, see `planner.plan'.
 
     Returns:
         clusters (list): list of lists. Each list is the collection
@@ -324,34 +461,17 @@ def _normalizedConSC(n, k, adj_mat, groups):
     Warnings:
         Shows error if there are isolated vertices.
     """
-    lap_mat = _get_lap_mat(adj_mat)
-
-    h = len(groups)
-
-    f_mat = np.zeros((n, h)) # each col represents group
-
-    for i  in range(h):
-        for j in groups[i]:
-            f_mat[j][i] = 1 # jth vertex in ith group
-
-    vs_by_n = np.array(list(map(lambda x: len(x)/n, groups))).reshape((1,h))
-    F = f_mat - vs_by_n
-    F = F[:, :-1] # all except the last column.
-
-    Z = null_space(F.T)
-
-    ## calculations from the paper ##
-    deg_mat = np.diag(np.sum(adj_mat, axis=0))
-    Q2 = Z.T @ (deg_mat @ Z)
-    Q = sqrtm(Q2)
-    Q_inv = np.linalg.inv(Q)
-
-    unorm_lap = Z.T @ (lap_mat @ Z)
-    new_lap_mat = Q_inv @ (unorm_lap @ Q_inv)
-    w, v = np.linalg.eigh(new_lap_mat)
-    X = v[:, :k+1]
-    H = Z @ (Q_inv @ X)
-    clusters = kMM(k, H)
+    sparse, matrix_free = _choose_path(n, k+1, len(edges), groups, True,
+                                       memory_budget, sparse)
+    adj_mat = profiled(profiler, 'adjacency', _get_adj_mat, n, edges,
+                       sparse)
+    mat, B = _get_operators(adj_mat, groups, normalized=True,
+                            matrix_free=matrix_free, profiler=profiler)
+
+    w, H = profiled(profiler, 'eigensolver', smallest_eigh, mat, k+1,
+                    solver, seed=seed, B=B)
+    clusters = profiled(profiler, 'kmeans', kMM, k, H, seed=seed,
+                        return_labels=return_labels)
 
     return clusters
 
@@ -368,38 +488,86 @@ _unnormalizedConSC
 _normalizedConSC
 """
 
-def _unnormalizedSC(n, k, adj_mat):
+def _unnormalizedSC(n, k, adj_mat, solver='auto', seed=None,
+                    return_labels=False, matrix_free=False, profiler=None,
+                    memory_budget=None):
     """
     Performs unnormalized Spectral clustering
 
     Params:
         n (int): the number of nodes in the graph.
         k (int): the number of clusters required.
-        adj_mat (np.ndarray): n*n adjacency matrix.
+        adj_mat (np.ndarray or scipy.sparse matrix): n*n adjacency
+                                                     matrix.
+        solver (str): (optional) eigensolver, see
+                      `eigensolvers.smallest_eigh'.
+        seed (int): (optional) seed of the random number generators,
+                    makes the clustering reproducible.
+        return_labels (bool): (optional) return an int32 array with
+                              the cluster of each node instead of
+                              the list of clusters.
+        matrix_free (bool): (optional) apply the Laplacian through
+                            adj_mat instead of assembling it, so a
+                            sparse adj_mat (e.g. memory-mapped, see
+                            `utils.graph_io') is never copied.
+        profiler (profiling.Profiler or function): (optional)
+            measures the time, memory and output sizes of each stage,
+            see `profiling.Profiler'.
+        memory_budget (int or str): (optional) bytes the run may use,
+            or 'auto' for the memory available. The fastest of the
+            dense, sparse and matrix-free paths estimated to fit is
+            used instead of `matrix_free' (a dense adj_mat is converted
+            to CSR for the sparse ones), and the function fails before
+            allocating anything if none fits, see `planner.plan'.
 
     Returns:
         clusters (list): a list whose element are list of labels of
                          nodes belonging to the same cluster.
 
     """
-    lap_mat = _get_lap_mat(adj_mat)
-
-    w, v = np.linalg.eigh(lap_mat)
-    vecs = v[:, :k]
+    adj_mat, matrix_free = _planned_adj_mat(adj_mat, k, None, False,
+                                            memory_budget, matrix_free)
+    mat, B = _get_operators(adj_mat, matrix_free=matrix_free,
+                            profiler=profiler)
 
-    clusters = kMM(k, vecs)
+    w, H = profiled(profiler, 'eigensolver', smallest_eigh, mat, k,
+                    solver, seed=seed, B=B)
+    clusters = profiled(profiler, 'kmeans', kMM, k, H, seed=seed,
+                        return_labels=return_labels)
 
     return clusters
 
 
-def _normalizedSC(n, k, adj_mat):
+def _normalizedSC(n, k, adj_mat, solver='auto', seed=None, return_labels=False,
+                  matrix_free=False, profiler=None, memory_budget=None):
     """
     Performs normalized Spectral clustering
 
     Params:
         n (int): the number of nodes in the graph.
         k (int): the number of clusters required.
-        adj_mat (np.ndarray): n*n adjacency matrix.
+        adj_mat (np.ndarray or scipy.sparse matrix): n*n adjacency
+                                                     matrix.
+        solver (str): (optional) eigensolver, see
+                      `eigensolvers.smallest_eigh'.
+        seed (int): (optional) seed of the random number generators,
+                    makes the clustering reproducible.
+        return_labels (bool): (optional) return an int32 array with
+                              the cluster of each node instead of
+                              the list of clusters.
+        matrix_free (bool): (optional) apply the Laplacian through
+                            adj_mat instead of assembling it, so a
+                            sparse adj_mat (e.g. memory-mapped, see
+                            `utils.graph_io') is never copied.
+        profiler (profiling.Profiler or function): (optional)
+            measures the time, memory and output sizes of each stage,
+            see `profiling.Profiler'.
+        memory_budget (int or str): (optional) bytes the run may use,
+            or 'auto' for the memory available. The fastest of the
+            dense, sparse and matrix-free paths estimated to fit is
+            used instead of `matrix_free' (a dense adj_mat is converted
+            to CSR for the sparse ones), and the function fails before
+            allocating anything if none fits, see `planner.plan'.
 
     Returns:
         clusters (list): a list whose element are list of labels of
@@ -408,19 +576,22 @@ def _normalizedSC(n, k, adj_mat):
     Warnings:
         Might throw a warning when there are isolated edges
     """
-    lap_mat = _get_lap_mat(adj_mat)
+    adj_mat, matrix_free = _planned_adj_mat(adj_mat, k, None, True,
+                                            memory_budget, matrix_free)
+    mat, B = _get_operators(adj_mat, normalized=True,
+                            matrix_free=matrix_free, profiler=profiler)
 
-    deg_mat = np.sum(adj_mat, axis=0)
-    deg_inv_half = np.diag(1/np.sqrt(deg_mat))
-    norm_lap_mat = deg_inv_half@(lap_mat @ deg_inv_half)
-    w, v = np.linalg.eigh(lap_mat)
-    vecs = v[:, :k]
-    clusters = kMM(k, vecs)
+    w, H = profiled(profiler, 'eigensolver', smallest_eigh, mat, k,
+                    solver, seed=seed, B=B)
+    clusters = profiled(profiler, 'kmeans', kMM, k, H, seed=seed,
+                        return_labels=return_labels)
 
     return clusters
 
 
-def _unnormalizedConSC(n, k, adj_mat, groups):
+def _unnormalizedConSC(n, k, adj_mat, groups, solver='auto', seed=None,
+                       return_labels=False, matrix_free=False, profiler=None,
+                       memory_budget=None):
     """
     Performs unnormalized spectral clustering with population fairness
     constraint.
@@ -428,40 +599,54 @@ def _unnormalizedConSC(n, k, adj_mat, groups):
     Params:
         n (int): the number of vertices in the graph.
         k (int): the number of clusters required.
-        adj_mat (np.ndarray): n*n adjacency matrix.
-        groups (list): list of lists. Each list is a collection
-                       of nodes forming a group.
+        adj_mat (np.ndarray or scipy.sparse matrix): n*n adjacency
+                                                     matrix.
+        groups (list or np.ndarray): list of lists. Each list is a
+                                     collection of nodes forming a
+                                     group. Or an array with the
+                                     group of each node.
+        solver (str): (optional) eigensolver, see
+                      `eigensolvers.smallest_eigh'.
+        seed (int): (optional) seed of the random number generators,
+                    makes the clustering reproducible.
+        return_labels (bool): (optional) return an int32 array with
+                              the cluster of each node instead of
+                              the list of clusters.
+        matrix_free (bool): (optional) apply the Laplacian through
+                            adj_mat instead of assembling it, so a
+                            sparse adj_mat (e.g. memory-mapped, see
+                            `utils.graph_io') is never copied.
+        profiler (profiling.Profiler or function): (optional)
+            measures the time, memory and output sizes of each stage,
+            see `profiling.Profiler'.
+        memory_budget (int or str): (optional) bytes the run may use,
+            or 'auto' for the memory available. The fastest of the
+            dense, sparse and matrix-free paths estimated to fit is
+            used instead of `matrix_free' (a dense adj_mat is converted
+            to CSR for the sparse ones), and the function fails before
+            allocating anything if none fits, see `planner.plan'.
 
     Returns:
         clusters (list): list of lists. Each list is the collection
                          of nodes forming the cluster.
     """
-    lap_mat = _get_lap_mat(adj_mat)
-
-    h = len(groups)
-    f_mat = np.zeros((n, h)) # each col represents group
-
-    for i  in range(h):
-        for j in groups[i]:
-            f_mat[j][i] = 1 # jth vertex in ith group
-
-    vs_by_n = np.array(list(map(lambda x: len(x)/n, groups))).reshape((1,h))
-    F = f_mat - vs_by_n
-    F = F[:, :-1] # all except the last column.
-
-    Z = null_space(F.T)
+    adj_mat, matrix_free = _planned_adj_mat(adj_mat, k, groups, False,
+                                            memory_budget, matrix_free)
+    mat, B = _get_operators(adj_mat, groups, matrix_free=matrix_free,
+                            profiler=profiler)
 
-    new_lap_mat = Z.T @ (lap_mat @ Z)
-    w,v = np.linalg.eigh(new_lap_mat)
-    Y = v[:, :k]
-    H = Z @ Y
-    clusters = kMM(k, H)
+    w, H = profiled(profiler, 'eigensolver', smallest_eigh, mat, k,
+                    solver, seed=seed, B=B)
+    clusters = profiled(profiler, 'kmeans', kMM, k, H, seed=seed,
+                        return_labels=return_labels)
 
     return clusters
 
 
 
-def _normalizedConSC(n, k, adj_mat, groups):
+def _normalizedConSC(n, k, adj_mat, groups, solver='auto', seed=None,
+                     return_labels=False, matrix_free=False, profiler=None,
+                     memory_budget=None):
     """
     Performs normalized spectral clustering with population fairness
     constraint.
@@ -469,9 +654,32 @@ def _normalizedConSC(n, k, adj_mat, groups):
     Params:
         n (int): the number of vertices in the graph.
         k (int): the number of clusters required.
-        adj_mat (np.ndarray): n*n adjacency matrix.
-        groups (list): list of lists. Each list is a collection
-                       of nodes forming a group.
+        adj_mat (np.ndarray or scipy.sparse matrix): n*n adjacency
+                                                     matrix.
+        groups (list or np.ndarray): list of lists. Each list is a
+                                     collection of nodes forming a
+                                     group. Or an array with the
+                                     group of each node.
+        solver (str): (optional) eigensolver, see
+                      `eigensolvers.smallest_eigh'.
+        seed (int): (optional) seed of the random number generators,
+                    makes the clustering reproducible.
+        return_labels (bool): (optional) return an int32 array with
+                              the cluster of each node instead of
+                              the list of clusters.
+        matrix_free (bool): (optional) apply the Laplacian through
+                            adj_mat instead of assembling it, so a
+                            sparse adj_mat (e.g. memory-mapped, see
+                            `utils.graph_io') is never copied.
+        profiler (profiling.Profiler or function): (optional)
+            measures the time, memory and output sizes of each stage,
+            see `profiling.Profiler'.
+        memory_budget (int or str): (optional) bytes the run may use,
+            or 'auto' for the memory available. The fastest of the
+            dense, sparse and matrix-free paths estimated to fit is
+            used instead of `matrix_free' (a dense adj_mat is converted
+            to CSR for the sparse ones), and the function fails before
+            allocating anything if none fits, see `planner.plan'.
 
     Returns:
         clusters (list): list of lists. Each list is the collection
@@ -480,33 +688,14 @@ def _normalizedConSC(n, k, adj_mat, groups):
     Warnings:
         Shows error if there are isolated vertices.
     """
-    lap_mat = _get_lap_mat(adj_mat)
-
-    h = len(groups)
-
-    f_mat = np.zeros((n, h)) # each col represents group
-
-    for i  in range(h):
-        for j in groups[i]:
-            f_mat[j][i] = 1 # jth vertex in ith group
-
-    vs_by_n = np.array(list(map(lambda x: len(x)/n, groups))).reshape((1,h))
-    F = f_mat - vs_by_n
-    F = F[:, :-1] # all except the last column.
-
-    Z = null_space(F.T)
-
-    ## calculations from the paper ##
-    deg_mat = np.diag(np.sum(adj_mat, axis=0))
-    Q2 = Z.T @ (deg_mat @ Z)
-    Q = sqrtm(Q2)
-    Q_inv = np.linalg.inv(Q)
-
-    unorm_lap = Z.T @ (lap_mat @ Z)
-    new_lap_mat = Q_inv @ (unorm_lap @ Q_inv)
-    w, v = np.linalg.eigh(new_lap_mat)
-    X = v[:, :k]
-    H = Z @ (Q_inv @ X)
-    clusters = kMM(k, H)
+    adj_mat, matrix_free = _planned_adj_mat(adj_mat, k, groups, True,
+                                            memory_budget, matrix_free)
+    mat, B = _get_operators(adj_mat, groups, normalized=True,
+                            matrix_free=matrix_free, profiler=profiler)
+
+    w, H = profiled(profiler, 'eigensolver', smallest_eigh, mat, k,
+                    solver, seed=seed, B=B)
+    clusters = profiled(profiler, 'kmeans', kMM, k, H, seed=seed,
+                        return_labels=return_labels)
 
     return clusters
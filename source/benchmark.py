@@ -0,0 +1,321 @@
+"""
+Benchmarks of the spectral clustering functions.
+
+Times and memory-profiles the four clustering functions and their
+adjacency matrix versions on SBM graphs over a grid of sizes, and on
+the drug and friendship datasets. Every measurement is written as one
+json object per line, after a first line describing the run (versions,
+commit, machine), so the files of two versions can be compared:
+
+    python benchmark.py --out new.jsonl
+    python benchmark.py --quick --variants normalizedConSC
+    python benchmark.py --compare old.jsonl new.jsonl
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import scipy
+
+import algorithms.spectral_clustering as al
+from algorithms.profiling import Profiler
+import utils.utils as ut
+from utils import cache
+from utils import drug as dr
+from utils import preprocessing as fnp
+
+
+# name -> (function, takes the adjacency matrix, takes groups)
+VARIANTS = {
+    'unnormalizedSC': (al.unnormalizedSC, False, False),
+    'normalizedSC': (al.normalizedSC, False, False),
+    'unnormalizedConSC': (al.unnormalizedConSC, False, True),
+    'normalizedConSC': (al.normalizedConSC, False, True),
+    '_unnormalizedSC': (al._unnormalizedSC, True, False),
+    '_normalizedSC': (al._normalizedSC, True, False),
+    '_unnormalizedConSC': (al._unnormalizedConSC, True, True),
+    '_normalizedConSC': (al._normalizedConSC, True, True),
+}
+
+# the SBM graphs: n vertices in k equal clusters and h equal groups,
+# density is the probability of an edge inside a cluster and a group.
+GRID = {
+    'n': [1000, 3000],
+    'density': [0.01, 0.05],
+    'k': [2, 5],
+    'h': [2, 4],
+    'sparse': [False, True],
+}
+
+QUICK_GRID = {
+    'n': [300],
+    'density': [0.05],
+    'k': [2],
+    'h': [2],
+    'sparse': [False, True],
+}
+
+DATASETS = ('drug', 'friendship')
+
+# the keys identifying a measurement across runs.
+KEY = ('dataset', 'variant', 'n', 'density', 'k', 'h', 'sparse')
+
+
+def sbm_case(n, density, k, h, seed=0):
+    """
+    Generates an SBM graph with groups (edge probabilities in the
+    ratios 5:4:3:2, as in test_new.py) and its ground truth.
+    """
+    cluster_sizes = [n//k + (i < n % k) for i in range(k)]
+    etas = [1/h]*(h - 1)
+    etas.append(1 - sum(etas))
+    edges, clusters, groups = ut.genGraphWithGroups(
+        n, cluster_sizes, etas, density, 0.8*density, 0.6*density,
+        0.4*density, seed=seed
+    )
+    return edges, groups, clusters
+
+
+def dataset_case(name):
+    """
+    Loads one of DATASETS (through the binary cache). Returns
+    (n, k, edges, groups), k being the number of clusters used by its
+    test script.
+    """
+    if name == 'drug':
+        path = '../data/drug/'
+        adj_mat, gender, ethinicity = cache.cached_load(
+            dr.get_sparse_adj_mat_and_groups,
+            [path+'DRUGNET.csv', path+'DRUGATTR.csv'], path
+        )
+        edges = np.stack(adj_mat.nonzero(), axis=1).astype(np.int32)
+        return adj_mat.shape[0], 7, edges, ethinicity
+
+    assert name == 'friendship', "unknown dataset: {}".format(name)
+    _, n, edges, _, _, reduced_group_list, _ = cache.cached_load(
+        fnp.get_friendshipnet_data, [fnp.METADATA_PATH, fnp.EDGES_PATH]
+    )
+    return n, 5, edges, reduced_group_list
+
+
+def run_variant(variant, n, k, edges, groups, sparse, repeat=3, seed=0,
+                truth=None):
+    """
+    Runs one clustering function `repeat' times, then once more under
+    tracemalloc, and returns the measurements.
+
+    The adjacency matrix of the `_' versions is built beforehand and
+    not timed. The time of each stage, averaged over the timed runs,
+    is recorded in 'stages'. tracemalloc sees the allocations of numpy
+    and of python objects but not the workspace of the Fortran
+    eigensolvers, so peak_mem is a lower bound.
+    """
+    func, takes_adj, takes_groups = VARIANTS[variant]
+    if takes_adj:
+        args = (n, k, al._get_adj_mat(n, edges, sparse))
+        kwargs = {}
+    else:
+        args = (n, k, edges)
+        kwargs = {'sparse': sparse}
+    if takes_groups:
+        args = args + (groups,)
+
+    def run(profiler=None):
+        return func(*args, seed=seed, return_labels=True,
+                    profiler=profiler, **kwargs)
+
+    profiler = Profiler()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        labels = run(profiler)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        run()
+        peak_mem = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    result = {
+        'times': times,
+        'time_min': min(times),
+        'time_median': float(np.median(times)),
+        'peak_mem': peak_mem,
+        'stages': {stage: t/repeat
+                   for stage, t in profiler.total().items()},
+        'min_balance': float(np.min(ut.get_balance(
+            ut.get_group_cluster_matrix(labels, groups)
+        ))),
+    }
+    if truth is not None:
+        result['error'] = ut.get_misclassification_rate(labels, truth)
+    return result
+
+
+def run_info():
+    """
+    Describes the environment of a run.
+    """
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+
+    return {
+        'type': 'run',
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def benchmark(grid=GRID, variants=tuple(VARIANTS), datasets=DATASETS,
+              repeat=3, seed=0, out=sys.stdout):
+    """
+    Runs the benchmarks and writes the results to `out' as json lines.
+
+    Params:
+        grid (dict): lists of values of n, density, k, h and sparse;
+                     every combination is benchmarked.
+        variants (list): (optional) names of the VARIANTS to run.
+        datasets (list): (optional) the DATASETS to run.
+        repeat (int): (optional) number of timed runs.
+        seed (int): (optional) seed of the graphs and the clusterings.
+        out (file): (optional) where the results are written.
+
+    Returns:
+        results (list): the measurements written.
+    """
+    out.write(json.dumps(run_info()) + '\n')
+
+    cases = []
+    for n, density, k, h in itertools.product(
+            grid['n'], grid['density'], grid['k'], grid['h']):
+        cases.append(({'dataset': 'sbm', 'n': n, 'density': density,
+                       'k': k, 'h': h},
+                      lambda n=n, density=density, k=k, h=h:
+                      (n, k) + sbm_case(n, density, k, h, seed)))
+    for name in datasets:
+        cases.append(({'dataset': name},
+                      lambda name=name: dataset_case(name) + (None,)))
+
+    results = []
+    for case, make in cases:
+        n, k, edges, groups, truth = make()
+        num_groups = int(np.max(groups)) + 1 if ut._is_labels(groups) \
+            else len(groups)
+        case = dict(case, n=n, k=k, h=num_groups, edges=len(edges),
+                    density=case.get('density', len(edges)/(n*(n - 1))))
+
+        for sparse, variant in itertools.product(grid['sparse'], variants):
+            record = dict(case, type='result', variant=variant,
+                          sparse=sparse)
+            try:
+                record.update(run_variant(variant, n, k, edges, groups,
+                                          sparse, repeat, seed, truth))
+            except Exception as e:
+                record['failed'] = '{}: {}'.format(type(e).__name__, e)
+
+            out.write(json.dumps(record) + '\n')
+            out.flush()
+            results.append(record)
+
+    return results
+
+
+def load_results(path):
+    """
+    Reads a file written by `benchmark'. Returns the run description
+    and the measurements.
+    """
+    with open(path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    info = next((r for r in records if r['type'] == 'run'), {})
+    return info, [r for r in records if r['type'] == 'result']
+
+
+def compare(old_path, new_path, threshold=1.2, out=sys.stdout):
+    """
+    Prints the ratios new/old of the median time and of the peak
+    memory of the measurements found in both files, flagging the ones
+    above threshold.
+
+    Returns:
+        regressions (list): the keys of the flagged measurements.
+    """
+    old = {tuple(r.get(key) for key in KEY): r
+           for r in load_results(old_path)[1] if 'failed' not in r}
+    regressions = []
+
+    for r in load_results(new_path)[1]:
+        key = tuple(r.get(key) for key in KEY)
+        if key not in old or 'failed' in r:
+            continue
+        time_ratio = r['time_median']/max(old[key]['time_median'], 1e-9)
+        mem_ratio = r['peak_mem']/max(old[key]['peak_mem'], 1)
+        flag = time_ratio > threshold or mem_ratio > threshold
+        if flag:
+            regressions.append(key)
+        out.write('{:<60} time {:6.2f}x  memory {:6.2f}x{}\n'.format(
+            ' '.join(map(str, key)), time_ratio, mem_ratio,
+            '  <-- regression' if flag else ''
+        ))
+
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--out', help="file the results are appended to "
+                                      "(json lines), stdout by default")
+    parser.add_argument('--quick', action='store_true',
+                        help="a single small SBM graph")
+    parser.add_argument('--variants', nargs='+', choices=list(VARIANTS),
+                        default=list(VARIANTS))
+    parser.add_argument('--datasets', nargs='*', choices=DATASETS,
+                        default=list(DATASETS))
+    parser.add_argument('--n', type=int, nargs='+')
+    parser.add_argument('--density', type=float, nargs='+')
+    parser.add_argument('--k', type=int, nargs='+')
+    parser.add_argument('--h', type=int, nargs='+')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+                        help="compare two result files instead")
+    parser.add_argument('--threshold', type=float, default=1.2)
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare(*args.compare, threshold=args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    grid = dict(QUICK_GRID if args.quick else GRID)
+    for name in ('n', 'density', 'k', 'h'):
+        if getattr(args, name):
+            grid[name] = getattr(args, name)
+
+    if args.out:
+        with open(args.out, 'a') as f:
+            benchmark(grid, args.variants, args.datasets, args.repeat,
+                      args.seed, f)
+    else:
+        benchmark(grid, args.variants, args.datasets, args.repeat,
+                  args.seed)
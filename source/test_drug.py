@@ -1,6 +1,7 @@
 import algorithms.spectral_clustering as al
 import utils.utils as ut
 from utils import drug as dr
+from utils import cache
 import numpy as np
 
 def get_sizes(clusters):
@@ -23,8 +24,11 @@ if __name__=="__main__":
         = dr._get_adj_mat_and_groups('../data/drug/')
     #output = dr.get_grouplists_drugnet()
     '''
-    adj_mat, gender, ethinicity\
-        = dr.__get_adj_mat_and_groups('../data/drug/')
+    path = '../data/drug/'
+    adj_mat, gender, ethinicity = cache.cached_load(
+        dr.__get_adj_mat_and_groups,
+        [path+'DRUGNET.csv', path+'DRUGATTR.csv'], path
+    )
 
 
     edges = getEdges(adj_mat)
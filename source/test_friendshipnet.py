@@ -1,6 +1,7 @@
 import algorithms.spectral_clustering as al
 import utils.utils as ut
 from utils import preprocessing as fnp
+from utils import cache
 import numpy as np
 
 def get_sizes(clusters):
@@ -10,7 +11,9 @@ def get_sizes(clusters):
 if __name__=="__main__":
     tot_num_nodes, num_conn_nodes, edges, orphan_nodes,\
     gender_group, reduced_group_list,\
-        reduced_class_group_list = fnp.get_friendshipnet_data()
+        reduced_class_group_list = cache.cached_load(
+            fnp.get_friendshipnet_data, [fnp.METADATA_PATH, fnp.EDGES_PATH]
+        )
 
     #print(edges)
 
@@ -22,9 +25,9 @@ if __name__=="__main__":
     ### vanilla unnormalized clustering ###
     clusters_vanilla_u = al.unnormalizedSC(num_nodes,
                                            num_clusters, edges)
-    cuts_vanilla_u = []
-    for c in clusters_vanilla_u:
-        cuts_vanilla_u.append(ut.get_num_cuts(edges, c))
+    labels_vanilla_u = ut.clusters_to_labels(clusters_vanilla_u, num_nodes)
+    cuts_vanilla_u = ut.get_cuts(edges, labels_vanilla_u,
+                                 len(clusters_vanilla_u)).tolist()
 
     group_cluster_mat_vanilla_u = ut.get_group_cluster_matrix(
         clusters_vanilla_u,
@@ -37,9 +40,9 @@ if __name__=="__main__":
     ### vanilla normalized clustering ###
     clusters_vanilla = al.normalizedSC(num_nodes,
                                      num_clusters, edges)
-    cuts_vanilla = []
-    for c in clusters_vanilla:
-        cuts_vanilla.append(ut.get_num_cuts(edges, c))
+    labels_vanilla = ut.clusters_to_labels(clusters_vanilla, num_nodes)
+    cuts_vanilla = ut.get_cuts(edges, labels_vanilla,
+                               len(clusters_vanilla)).tolist()
 
     group_cluster_mat_vanilla = ut.get_group_cluster_matrix(
         clusters_vanilla,
@@ -54,9 +57,9 @@ if __name__=="__main__":
     clusters_con_u = al.unnormalizedConSC(num_nodes,
                                           num_clusters, edges,
                                           groups)
-    cuts_con_u = []
-    for c in clusters_con_u:
-        cuts_con_u.append(ut.get_num_cuts(edges, c))
+    labels_con_u = ut.clusters_to_labels(clusters_con_u, num_nodes)
+    cuts_con_u = ut.get_cuts(edges, labels_con_u,
+                             len(clusters_con_u)).tolist()
 
     group_cluster_mat_con_u = ut.get_group_cluster_matrix(
         clusters_con_u,
@@ -71,9 +74,9 @@ if __name__=="__main__":
     clusters_con = al.normalizedConSC(num_nodes,
                                       num_clusters, edges,
                                       groups)
-    cuts_con = []
-    for c in clusters_con:
-        cuts_con.append(ut.get_num_cuts(edges, c))
+    labels_con = ut.clusters_to_labels(clusters_con, num_nodes)
+    cuts_con = ut.get_cuts(edges, labels_con,
+                           len(clusters_con)).tolist()
 
     group_cluster_mat_con = ut.get_group_cluster_matrix(
         clusters_con,
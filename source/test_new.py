@@ -30,9 +30,9 @@ if __name__ == "__main__":
 
     ## unnormalized vanilla SC ##
     clusters_vanilla_u = al.unnormalizedSC(num_vertices, num_clusters, edges)
-    cuts_vanilla_u = []
-    for c in clusters_vanilla_u:
-        cuts_vanilla_u.append(ut.get_num_cuts(edges, c))
+    labels_vanilla_u = ut.clusters_to_labels(clusters_vanilla_u, num_vertices)
+    cuts_vanilla_u = ut.get_cuts(edges, labels_vanilla_u,
+                                 len(clusters_vanilla_u)).tolist()
 
     misMat_vanilla_u = ut.getMisclassificationMat(clusters_vanilla_u, clusters_original)
     group_cluster_mat_vanilla_u = ut.get_group_cluster_matrix(clusters_vanilla_u,
@@ -41,9 +41,9 @@ if __name__ == "__main__":
 
     ## normalized vanilla SC ##
     clusters_vanilla = al.normalizedSC(num_vertices, num_clusters, edges)
-    cuts_vanilla = []
-    for c in clusters_vanilla_u:
-        cuts_vanilla.append(ut.get_num_cuts(edges, c))
+    labels_vanilla = ut.clusters_to_labels(clusters_vanilla, num_vertices)
+    cuts_vanilla = ut.get_cuts(edges, labels_vanilla,
+                               len(clusters_vanilla)).tolist()
 
     misMat_vanilla = ut.getMisclassificationMat(clusters_vanilla, clusters_original)
     group_cluster_mat_vanilla = ut.get_group_cluster_matrix(clusters_vanilla,
@@ -51,10 +51,9 @@ if __name__ == "__main__":
 
     ## unnormalized cons SC ##
     clusters_con_u = al.unnormalizedConSC(num_vertices, num_clusters, edges, groups)
-    cuts_con_u = []
-
-    for c in clusters_con_u:
-        cuts_con_u.append(ut.get_num_cuts(edges, c))
+    labels_con_u = ut.clusters_to_labels(clusters_con_u, num_vertices)
+    cuts_con_u = ut.get_cuts(edges, labels_con_u,
+                             len(clusters_con_u)).tolist()
 
     misMat_con_u = ut.getMisclassificationMat(clusters_con_u, clusters_original)
     group_cluster_mat_con_u = ut.get_group_cluster_matrix(clusters_con_u, groups)
@@ -62,10 +61,9 @@ if __name__ == "__main__":
 
     ## normalized cons SC ##
     clusters_con = al.normalizedConSC(num_vertices, num_clusters, edges, groups)
-    cuts_con = []
-
-    for c in clusters_con:
-        cuts_con.append(ut.get_num_cuts(edges, c))
+    labels_con = ut.clusters_to_labels(clusters_con, num_vertices)
+    cuts_con = ut.get_cuts(edges, labels_con,
+                           len(clusters_con)).tolist()
 
     misMat_con = ut.getMisclassificationMat(clusters_con, clusters_original)
     group_cluster_mat_con = ut.get_group_cluster_matrix(clusters_con, groups)
@@ -0,0 +1,245 @@
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import scipy.sparse as sp
+
+
+# bump when the layout of the cache changes, or when a fix to code
+# outside the loader's module changes what the loader returns.
+CACHE_VERSION = 1
+
+# files are hashed in blocks of this many bytes.
+HASH_BLOCK = 1 << 20
+
+
+def cached_load(loader, sources, *args, cache_dir=None, **kwargs):
+    """
+    Calls loader(*args, **kwargs) and stores what it returns in a
+    binary cache, or reloads it from the cache if the source files and
+    the arguments have not changed.
+
+    The entry is a directory of .npy files (one per array, the three
+    arrays of a CSR matrix, one per list of ints) and a json manifest
+    of the structure of the returned value. It is keyed by a hash of
+    the loader, the source code of its module, its arguments (arrays
+    by their contents) and the contents of the source files, so
+    editing a data file or the module of the loader invalidates it.
+    Arrays are reloaded memory-mapped (read-only).
+
+    Params:
+        loader (function): the function reading the dataset. It may
+                           return ints, floats, strings, None, arrays,
+                           scipy.sparse matrices and (nested) lists or
+                           tuples of those.
+        sources (list): paths of the files read by the loader.
+        args, kwargs: the arguments of the loader.
+        cache_dir (str): (optional) where the entries are kept,
+                         defaults to .cache next to the first source.
+
+    Returns:
+        the value returned by the loader.
+
+    Warnings:
+        Changes to code in other modules that the loader calls (e.g.
+        `ingest.read_chunks') are not detected: bump CACHE_VERSION
+        when they change what the loader returns.
+    """
+    if cache_dir is None:
+        cache_dir = os.path.join(
+            os.path.dirname(os.path.abspath(sources[0])), '.cache'
+        )
+    os.makedirs(cache_dir, exist_ok=True)
+
+    key = _cache_key(loader, sources, args, kwargs, cache_dir)
+    entry = os.path.join(cache_dir, '{}-{}'.format(loader.__name__, key))
+
+    if os.path.isfile(os.path.join(entry, 'manifest.json')):
+        return _load_entry(entry)
+
+    value = loader(*args, **kwargs)
+    _save_entry(entry, value)
+    return value
+
+
+def _cache_key(loader, sources, args, kwargs, cache_dir):
+    h = hashlib.sha256()
+    h.update(repr((CACHE_VERSION, loader.__module__,
+                   loader.__qualname__)).encode())
+    h.update(_code_digest(loader).encode())
+    _hash_value(h, (args, sorted(kwargs.items())))
+    for path in sources:
+        h.update(_file_digest(path, cache_dir).encode())
+    return h.hexdigest()[:32]
+
+
+def _code_digest(loader):
+    """
+    sha256 of the source code of the module defining the loader (of
+    the loader's bytecode if the source is not available), so fixes to
+    the loader and to its helpers invalidate the entries.
+    """
+    try:
+        code = inspect.getsource(inspect.getmodule(loader)).encode()
+    except (TypeError, OSError):
+        code = getattr(getattr(loader, '__code__', None), 'co_code', b'')
+    return hashlib.sha256(code).hexdigest()
+
+
+def _hash_value(h, value):
+    """
+    Feeds an argument of the loader to h. Arrays are hashed by their
+    contents, as repr abbreviates large ones.
+    """
+    if sp.issparse(value):
+        value = value.tocsr()
+        h.update(repr(('csr', value.shape)).encode())
+        for array in (value.data, value.indices, value.indptr):
+            _hash_value(h, array)
+    elif isinstance(value, np.ndarray):
+        h.update(repr(('array', value.dtype.str, value.shape)).encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple)):
+        h.update('{}:{}('.format(type(value).__name__,
+                                 len(value)).encode())
+        for item in value:
+            _hash_value(h, item)
+        h.update(b')')
+    else:
+        h.update(repr(value).encode())
+
+
+def _file_digest(path, cache_dir):
+    """
+    sha256 of the contents of a file. The digests are remembered
+    together with the size and modification time of the files, so an
+    unchanged file is not read again.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    index_path = os.path.join(cache_dir, 'digests.json')
+
+    try:
+        with open(index_path) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+
+    known = index.get(path)
+    if known is not None and known[:2] == [stat.st_size, stat.st_mtime_ns]:
+        return known[2]
+
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            h.update(block)
+    digest = h.hexdigest()
+
+    index[path] = [stat.st_size, stat.st_mtime_ns, digest]
+    _write_json(index_path, index)
+    return digest
+
+
+def _write_json(path, obj):
+    # write then rename, so readers never see a partial file.
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'w') as f:
+        json.dump(obj, f)
+    os.replace(tmp, path)
+
+
+def _save_entry(entry, value):
+    tmp = tempfile.mkdtemp(dir=os.path.dirname(entry))
+    try:
+        arrays = {}
+        manifest = {'version': CACHE_VERSION,
+                    'value': _encode(value, arrays)}
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp, name + '.npy'), array)
+        with open(os.path.join(tmp, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f)
+        os.rename(tmp, entry)
+    except OSError:
+        # another process stored the same entry first.
+        pass
+    finally:
+        if os.path.isdir(tmp):
+            shutil.rmtree(tmp)
+
+
+def _load_entry(entry):
+    with open(os.path.join(entry, 'manifest.json')) as f:
+        manifest = json.load(f)
+
+    def load(name):
+        return np.load(os.path.join(entry, name + '.npy'), mmap_mode='r')
+
+    return _decode(manifest['value'], load)
+
+
+def _is_int(x):
+    return isinstance(x, (int, np.integer)) and not isinstance(x, bool)
+
+
+def _encode(value, arrays):
+    """
+    Describes `value' as json, putting its arrays in `arrays'.
+    """
+    def new_array(array):
+        name = 'a{}'.format(len(arrays))
+        arrays[name] = np.asarray(array)
+        return name
+
+    if value is None or isinstance(value, (bool, str)):
+        return {'type': 'scalar', 'value': value}
+
+    if _is_int(value):
+        return {'type': 'scalar', 'value': int(value)}
+
+    if isinstance(value, (float, np.floating)):
+        return {'type': 'scalar', 'value': float(value)}
+
+    if sp.issparse(value):
+        value = value.tocsr()
+        return {'type': 'csr', 'shape': list(value.shape),
+                'data': new_array(value.data),
+                'indices': new_array(value.indices),
+                'indptr': new_array(value.indptr)}
+
+    if isinstance(value, np.ndarray):
+        return {'type': 'array', 'name': new_array(value)}
+
+    if isinstance(value, list) and len(value) and all(map(_is_int, value)):
+        return {'type': 'int_list',
+                'name': new_array(np.array(value, dtype=np.int64))}
+
+    if isinstance(value, (list, tuple)):
+        return {'type': type(value).__name__,
+                'items': [_encode(item, arrays) for item in value]}
+
+    raise TypeError("cannot cache values of type {}".format(type(value)))
+
+
+def _decode(spec, load):
+    kind = spec['type']
+
+    if kind == 'scalar':
+        return spec['value']
+
+    if kind == 'csr':
+        return sp.csr_matrix((load(spec['data']), load(spec['indices']),
+                              load(spec['indptr'])),
+                             shape=tuple(spec['shape']), copy=False)
+
+    if kind == 'array':
+        return load(spec['name'])
+
+    if kind == 'int_list':
+        return load(spec['name']).tolist()
+
+    items = [_decode(item, load) for item in spec['items']]
+    return items if kind == 'list' else tuple(items)
@@ -1,4 +1,7 @@
 import numpy as np
+import scipy.sparse as sp
+
+from .ingest import CHUNK_ENTRIES, read_chunks
 
 
 def isSymmetric(mat):
@@ -9,125 +12,125 @@ def isSymmetric(mat):
 
 
 def symmetrize1(mat):
-    n = mat.shape[0]
-    new_mat = []
-    for i in range(n):
-        row = mat[i,:].reshape(-1)
-        col = mat[:,i].reshape(-1)
-        new_row = (row+col>0).astype(np.int32)
-        new_mat.append(new_row)
+    """
+    Symmetrization using or: (i, j) is an edge if (i, j) or (j, i)
+    is. Sparse matrices stay sparse.
+    """
+    if sp.issparse(mat):
+        sym = mat.maximum(mat.T).tocsr()
+        sym.data = (sym.data > 0).astype(np.int32)
+        sym.eliminate_zeros()
+        return sym
 
-    return np.array(new_mat)
+    mat = np.asarray(mat)
+    return (mat + mat.T > 0).astype(np.int32)
 
 
 def symmetrize2(mat):
-    n = mat.shape[0]
-    new_mat = []
-    for i in range(n):
-        row = mat[i,:].reshape(-1)
-        col = mat[:, i].reshape(-1)
-        new_row = (row*col>0).astype(np.int32)
-        new_mat.append(new_row)
+    """
+    Symmetrization using and: (i, j) is an edge if both (i, j) and
+    (j, i) are. Sparse matrices stay sparse.
+    """
+    if sp.issparse(mat):
+        sym = mat.multiply(mat.T).tocsr()
+        sym.data = (sym.data > 0).astype(np.int32)
+        sym.eliminate_zeros()
+        return sym
 
-    return np.array(new_mat)
+    mat = np.asarray(mat)
+    return (mat*mat.T > 0).astype(np.int32)
 
 
-def __get_adj_mat_and_groups(path):
-    adj_mat = []
-    get_new_label = {}
-    new_label = 0
+def read_adj_mat(path):
+    """
+    Reads an adjacency matrix stored as a dense CSV file (a header
+    line, then one row per node starting with its label) into CSR
+    format, a block of rows (about CHUNK_ENTRIES values) at a time.
 
-    with open(path+'DRUGNET.csv') as f:
-        f.readline()
-        for line in f:
-            line = line.strip().split(',')
-            line = [int(x) for x in line]
-            old_label = line[0]
-            line = np.array(line[1:], dtype=np.int32)
-            get_new_label[old_label] = new_label
-            new_label+=1
-            adj_mat.append(line)
+    Params:
+        path (str): path to the CSV file.
 
-    adj_mat = np.array(adj_mat, dtype=np.int32)
-    adj_symm1 = symmetrize1(adj_mat)
-    adj_symm2 = symmetrize2(adj_mat)
+    Returns:
+        adj_mat (scipy.sparse.csr_matrix): n*n matrix of np.int32's.
+        labels (np.ndarray): the label of each row.
+    """
+    with open(path, encoding='utf-8-sig') as f:
+        n_cols = f.readline().count(',') + 1
 
-    # male # female
-    gender = [[], [], []]
+    blocks, labels = [], []
+    for chunk in read_chunks(path, dtype=np.int32, delimiter=',',
+                             skiprows=1,
+                             chunk_size=max(1, CHUNK_ENTRIES // n_cols)):
+        labels.append(chunk[:, 0])
+        blocks.append(sp.csr_matrix(chunk[:, 1:]))
 
-    # aff_am # latino # white/other
-    ethinicity = [[], [], []]
+    return sp.vstack(blocks, format='csr'), np.concatenate(labels)
 
-    with open(path+'DRUGATTR.csv') as f:
-        f.readline()
-        for line in f:
-            line = line.strip().split(',')[:-1]
-            line = [int(x) for x in line]
-            node, eth, gend = get_new_label[line[0]], line[1], line[2]
 
-            if eth==2:
-                ethinicity[0].append(node)
+def _read_groups(path, get_new_label):
+    """
+    Reads DRUGATTR.csv. Returns the node of each row (through the
+    array get_new_label, -1 for nodes to leave out), its ethinicity
+    group and its gender group.
+    """
+    attrs = np.concatenate(list(read_chunks(path, usecols=(0, 1, 2),
+                                            delimiter=',', skiprows=1)))
+    nodes = get_new_label[attrs[:, 0]]
 
-            elif eth==3:
-                ethinicity[1].append(node)
+    # aff_am # latino # white/other
+    eth = np.select([attrs[:, 1] == 2, attrs[:, 1] == 3], [0, 1], 2)
+    # male # female # unspecified
+    gend = np.select([attrs[:, 2] == 1, attrs[:, 2] == 2], [0, 1], 2)
 
-            else:
-                ethinicity[2].append(node)
+    return nodes, eth, gend
 
-            if gend==1:
-                gender[0].append(node)
 
-            elif gend==2:
-                gender[1].append(node)
+def _group_lists(nodes, labels, h):
+    # list of lists of nodes, in the order of the rows.
+    keep = nodes >= 0
+    return [nodes[keep & (labels == g)].tolist() for g in range(h)]
 
-            else:
-                gender[2].append(node)
 
+def get_sparse_adj_mat_and_groups(path):
+    """
+    Sparse version of `__get_adj_mat_and_groups': the adjacency matrix
+    is parsed in bulk, symmetrized with or as a sparse matrix and the
+    isolated vertices are removed with a relabel map, in O(n + nnz)
+    after parsing.
+
+    Params:
+        path (str): path to the folder containing DRUGNET.csv and
+                    DRUGATTR.csv.
+
+    Returns:
+        adj_symm1 (scipy.sparse.csr_matrix): symmetrization using or,
+                                             without isolated vertices.
+        gender (list): list of list of nodes forming gender groups
+                       (last position contains gender unspecified)
+        ethinicity (list): list of list of nodes forming ethinic groups
+    """
+    adj_mat, old_labels = read_adj_mat(path+'DRUGNET.csv')
+    adj_symm1 = symmetrize1(adj_mat)
 
     ## remove isolated vertices ##
-    new_label_1 = {}
-    n_lab = 0
-    new_as1 = []
-    num_vertices = len(adj_symm1)
-    removed_vertices = []
-
-    for i in range(num_vertices):
-        if np.any(adj_symm1[i,:]!=0):
-            new_row = adj_symm1[i].reshape(-1)
-            new_as1.append(new_row)
-            new_label_1[i] = n_lab
-            n_lab += 1
-        else:
-            removed_vertices.append(i)
-
-    new_as1 = np.array(new_as1, dtype=np.int32)
-
-    delta = [False if i in removed_vertices else True
-             for i in range(num_vertices)]
-
-    new_as1 = new_as1[:, delta]
-
-    #print(isSymmetric(new_as1))
-    #print(new_as1.shape)
-    #print(new_label_1.values())
-
-
-    new_gender = [[], [], []]
-    for g_num, gend in enumerate(gender):
-        for v in gend:
-            if v in new_label_1.keys():
-                new_gender[g_num].append(new_label_1[v])
-
-    new_ethinicity = [[], [], []]
-    for e_num, eth in enumerate(ethinicity):
-        for v in eth:
-            if v in new_label_1.keys():
-                new_ethinicity[e_num].append(new_label_1[v])
-    f = lambda x: len(x)
-    #print(list(map(f,new_gender)))
-    #print(list(map(f, new_ethinicity)))
-
-    return new_as1, new_gender, new_ethinicity
+    keep = np.diff(adj_symm1.indptr) > 0
+    relabel = np.full(len(keep), -1, dtype=np.int64)
+    relabel[keep] = np.arange(np.sum(keep))
+    adj_symm1 = adj_symm1[keep][:, keep]
+
+    # old label -> new label
+    get_new_label = np.full(np.max(old_labels) + 1, -1, dtype=np.int64)
+    get_new_label[old_labels] = relabel
+
+    nodes, eth, gend = _read_groups(path+'DRUGATTR.csv', get_new_label)
+
+    return adj_symm1, _group_lists(nodes, gend, 3), \
+        _group_lists(nodes, eth, 3)
+
+
+def __get_adj_mat_and_groups(path):
+    adj_symm1, gender, ethinicity = get_sparse_adj_mat_and_groups(path)
+    return adj_symm1.toarray(), gender, ethinicity
     #return adj_mat, adj_symm1, adj_symm2, gender, ethinicity
 
 
@@ -0,0 +1,90 @@
+import json
+import os
+
+import numpy as np
+import scipy.sparse as sp
+
+
+# bump when the layout of the directory changes.
+FORMAT_VERSION = 1
+
+
+def save_graph(path, adj_mat, groups=None):
+    """
+    Writes a graph in the on-disk format read by `load_graph': a
+    directory with the CSR arrays of the adjacency matrix and the group
+    labels as raw .npy files, and a small json header.
+
+    Params:
+        path (str): the directory to write (created if needed).
+        adj_mat (np.ndarray or scipy.sparse matrix): n*n adjacency
+                                                     matrix.
+        groups (np.ndarray or list): (optional) array of the group of
+                                     each node, or list of lists of
+                                     nodes forming the groups.
+    """
+    adj_mat = sp.csr_matrix(adj_mat)
+    n = adj_mat.shape[0]
+    os.makedirs(path, exist_ok=True)
+
+    # scipy copies the index arrays when their types differ.
+    index_dtype = np.int32 if adj_mat.nnz < 2**31 else np.int64
+    np.save(os.path.join(path, 'indptr.npy'),
+            adj_mat.indptr.astype(index_dtype, copy=False))
+    np.save(os.path.join(path, 'indices.npy'),
+            adj_mat.indices.astype(index_dtype, copy=False))
+    np.save(os.path.join(path, 'data.npy'),
+            adj_mat.data.astype(np.float64, copy=False))
+
+    header = {'version': FORMAT_VERSION, 'shape': [n, adj_mat.shape[1]],
+              'nnz': int(adj_mat.nnz), 'groups': groups is not None}
+
+    if groups is not None:
+        if not (isinstance(groups, np.ndarray) and groups.ndim == 1):
+            labels = np.full(n, -1, dtype=np.int32)
+            for g, group in enumerate(groups):
+                labels[np.asarray(group, dtype=np.int64)] = g
+            groups = labels
+        np.save(os.path.join(path, 'groups.npy'),
+                np.asarray(groups, dtype=np.int32))
+
+    with open(os.path.join(path, 'graph.json'), 'w') as f:
+        json.dump(header, f)
+
+
+def load_graph(path, mmap=True):
+    """
+    Opens a graph written by `save_graph'.
+
+    With mmap the arrays are memory-mapped read-only and wrapped in a
+    CSR matrix without copying, so the pages are read on demand and
+    shared by all the processes opening the same graph. Pass the
+    matrix with matrix_free=True to the adjacency matrix versions of
+    the clustering functions (e.g. `_normalizedConSC') to keep it that
+    way through the eigensolver.
+
+    Params:
+        path (str): the directory of the graph.
+        mmap (bool): (optional) memory-map the arrays instead of
+                     reading them into memory.
+
+    Returns:
+        adj_mat (scipy.sparse.csr_matrix): n*n adjacency matrix.
+        groups (np.ndarray): array of n int32's, the group of each
+                             node (None if the graph has no groups).
+    """
+    with open(os.path.join(path, 'graph.json')) as f:
+        header = json.load(f)
+    assert header['version'] == FORMAT_VERSION, \
+        "unsupported graph format version: {}".format(header['version'])
+
+    mode = 'r' if mmap else None
+
+    def load(name):
+        return np.load(os.path.join(path, name + '.npy'), mmap_mode=mode)
+
+    adj_mat = sp.csr_matrix((load('data'), load('indices'), load('indptr')),
+                            shape=tuple(header['shape']), copy=False)
+    groups = load('groups') if header['groups'] else None
+
+    return adj_mat, groups
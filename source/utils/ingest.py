@@ -0,0 +1,160 @@
+from itertools import islice
+
+import numpy as np
+import scipy.sparse as sp
+
+from .sbm import _sorted_unique
+
+
+# files are parsed this many lines at a time.
+CHUNK_LINES = 1 << 20
+
+# files with long lines (dense matrices) are parsed about this many
+# values at a time.
+CHUNK_ENTRIES = 1 << 22
+
+
+def read_chunks(path, usecols=None, dtype=np.int64, delimiter=None,
+                comments='#', skiprows=0, chunk_size=CHUNK_LINES):
+    """
+    Reads a delimited text file in chunks of rows.
+
+    Params:
+        path (str): path to the file.
+        usecols (tuple): (optional) the columns to read, all by
+                         default.
+        dtype (type): (optional) type of the values (np.int64, str,
+                      ...).
+        delimiter (str): (optional) column separator, any whitespace
+                         by default.
+        comments (str): (optional) lines starting with it are skipped.
+        skiprows (int): (optional) number of header lines.
+        chunk_size (int): (optional) number of lines per chunk.
+
+    Returns:
+        chunks (generator): yields 2 dimensional arrays of m rows.
+    """
+    with open(path, encoding='utf-8-sig') as f:
+        for _ in range(skiprows):
+            f.readline()
+
+        while True:
+            lines = list(islice(f, chunk_size))
+            if not lines:
+                return
+            lines = [line for line in lines
+                     if line.strip() and not line.startswith(comments)]
+            if lines:
+                yield np.loadtxt(lines, dtype=dtype, delimiter=delimiter,
+                                 usecols=usecols, ndmin=2)
+
+
+def ingest_graph(edge_path, attr_path=None, attr_columns=(1,),
+                 id_column=0, symmetrize='or', include_isolated=False,
+                 delimiter=None, attr_delimiter=None, comments='#',
+                 skiprows=0, attr_skiprows=0, chunk_size=CHUNK_LINES):
+    """
+    Builds a graph ready for the clustering functions from an edge
+    list with arbitrary node IDs and, optionally, a table of node
+    attributes defining the groups.
+
+    The edge file is streamed twice, in chunks: once to collect the
+    node IDs, then to remap each chunk to contiguous int32 indices (in
+    increasing order of ID) before the next one is parsed, so only one
+    chunk of raw IDs is held at a time. Duplicate edges and self loops
+    are dropped and the adjacency matrix is assembled in CSR format,
+    so no n*n matrix is ever formed.
+
+    Params:
+        edge_path (str): file with one edge per line, the first two
+                         columns are the IDs of its ends.
+        attr_path (str): (optional) file with one node per line.
+        attr_columns (tuple): (optional) the columns of attr_path
+                              holding the attributes; each of them
+                              defines a grouping of the nodes.
+        id_column (int): (optional) the column of attr_path holding
+                         the node ID.
+        symmetrize (str): (optional) 'or' -> (i, j) is an edge if
+                          either direction is listed, 'and' -> if both
+                          are, None -> keep the directed graph.
+        include_isolated (bool): (optional) also keep the nodes that
+                                 only appear in attr_path.
+        delimiter (str): (optional) column separator of edge_path,
+                         any whitespace by default.
+        attr_delimiter (str): (optional) column separator of
+                              attr_path.
+        comments (str): (optional) lines starting with it are skipped.
+        skiprows (int): (optional) header lines of edge_path.
+        attr_skiprows (int): (optional) header lines of attr_path.
+        chunk_size (int): (optional) number of lines parsed at once.
+
+    Returns:
+        adj_mat (scipy.sparse.csr_matrix): n*n adjacency matrix.
+        groups (list): one array of n int32's per attribute column,
+                       the group of each node (-1 if the node has no
+                       attributes). `utils.labels_to_clusters' turns
+                       it into a list of lists of nodes.
+        ids (np.ndarray): the original ID of each node.
+        categories (list): per attribute column, the attribute value
+                           of each group.
+
+    Warnings:
+        Throws error if symmetrize is not one of 'or', 'and', None.
+    """
+    assert symmetrize in ('or', 'and', None), \
+        "unknown symmetrization: {}".format(symmetrize)
+
+    def edge_chunks():
+        return read_chunks(edge_path, (0, 1), np.int64, delimiter,
+                           comments, skiprows, chunk_size)
+
+    ids = np.zeros(0, np.int64)
+    for chunk in edge_chunks():
+        ids = _sorted_unique(np.concatenate([ids, _sorted_unique(chunk)]))
+
+    if attr_path is not None:
+        attr_chunks = list(read_chunks(
+            attr_path, (id_column,) + tuple(attr_columns), str,
+            attr_delimiter, comments, attr_skiprows, chunk_size
+        ))
+        attrs = np.concatenate(
+            attr_chunks + [np.zeros((0, 1 + len(attr_columns)), str)]
+        )
+        attr_ids = attrs[:, 0].astype(np.int64)
+        if include_isolated:
+            ids = _sorted_unique(np.concatenate([ids, attr_ids]))
+
+    n = len(ids)
+    rows, cols = [], []
+    for chunk in edge_chunks():
+        edges = np.searchsorted(ids, chunk).astype(np.int32)
+        edges = edges[edges[:, 0] != edges[:, 1]]
+        rows.append(edges[:, 0])
+        cols.append(edges[:, 1])
+
+    rows = np.concatenate(rows + [np.zeros(0, np.int32)])
+    cols = np.concatenate(cols + [np.zeros(0, np.int32)])
+    adj_mat = sp.csr_matrix((np.ones(len(rows)), (rows, cols)),
+                            shape=(n, n))
+    # duplicates were summed.
+    adj_mat.data[:] = 1
+
+    if symmetrize == 'or':
+        adj_mat = adj_mat.maximum(adj_mat.T).tocsr()
+    elif symmetrize == 'and':
+        adj_mat = adj_mat.multiply(adj_mat.T).tocsr()
+        adj_mat.eliminate_zeros()
+
+    groups, categories = [], []
+    if attr_path is not None:
+        pos = np.minimum(np.searchsorted(ids, attr_ids), max(n - 1, 0))
+        known = (ids[pos] == attr_ids) if n else np.zeros(0, bool)
+        for j in range(len(attr_columns)):
+            values, codes = np.unique(attrs[known, j+1],
+                                      return_inverse=True)
+            labels = np.full(n, -1, dtype=np.int32)
+            labels[pos[known]] = codes
+            groups.append(labels)
+            categories.append(values)
+
+    return adj_mat, groups, ids, categories
@@ -0,0 +1,236 @@
+import hashlib
+import os
+
+import numpy as np
+import networkx as nx
+from matplotlib.collections import LineCollection
+
+
+METHODS = ('auto', 'spring', 'spectral')
+
+# 'auto' uses the spring layout up to this many vertices (it takes a few
+# seconds at 1000) and the spectral layout above.
+SPRING_MAX_NODES = 1000
+
+# layouts computed in this process, by `_layout_key'.
+_LAYOUTS = {}
+
+
+def get_layout(n, edges, method='auto', embedding=None, seed=0,
+               cache_dir=None):
+    """
+    Gives 2d coordinates for the vertices of a graph.
+
+    Layouts are cached by graph, method and seed in memory, and also
+    in cache_dir if given, so every figure of the same graph (within
+    and across runs) reuses the first one computed.
+
+    Params:
+        n (int): number of vertices in the graph.
+        edges (np.ndarray): |E|*2 matrix, each row is an edge.
+        method (str): (optional) 'spring' -> force directed layout,
+                      'spectral' -> eigenvectors of the Laplacian
+                      (both from networkx), 'auto' -> spring up to
+                      SPRING_MAX_NODES vertices, else spectral.
+        embedding (np.ndarray): (optional) n*m spectral embedding
+                                already computed by the clustering
+                                (e.g. `embedding_' of the estimator);
+                                its first two non-constant columns are
+                                used as coordinates, at no cost.
+        seed (int): (optional) seed of the spring layout.
+        cache_dir (str): (optional) directory where layouts are kept
+                         between runs.
+
+    Returns:
+        pos (np.ndarray): n*2 array, the coordinates of each vertex.
+    """
+    if embedding is not None:
+        return _embedding_coords(embedding)
+
+    assert method in METHODS, "unknown layout: {}".format(method)
+
+    if method == 'auto':
+        method = 'spring' if n <= SPRING_MAX_NODES else 'spectral'
+
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    key = _layout_key(n, edges, method, seed)
+    if key in _LAYOUTS:
+        return _LAYOUTS[key]
+
+    path = None if cache_dir is None \
+        else os.path.join(cache_dir, 'layout-{}.npy'.format(key))
+
+    if path is not None and os.path.isfile(path):
+        pos = np.load(path)
+    else:
+        G = nx.Graph()
+        G.add_nodes_from(range(n))
+        G.add_edges_from(edges.tolist())
+        if method == 'spring':
+            pos_dict = nx.spring_layout(G, seed=seed)
+        else:
+            pos_dict = nx.spectral_layout(G)
+        pos = np.array([pos_dict[v] for v in range(n)]).reshape(n, 2)
+
+        if path is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            np.save(path, pos)
+
+    _LAYOUTS[key] = pos
+    return pos
+
+
+def _layout_key(n, edges, method, seed):
+    h = hashlib.sha1()
+    h.update(repr((n, method, seed)).encode())
+    h.update(np.ascontiguousarray(edges).tobytes())
+    return h.hexdigest()
+
+
+def _embedding_coords(embedding):
+    H = np.asarray(embedding, dtype=np.float64)
+    H = H.reshape(len(H), -1)
+    std = np.std(H, axis=0)
+    cols = np.flatnonzero(std > 1e-8*np.max(np.abs(H), axis=0))
+    if len(cols) < 2:
+        cols = np.arange(min(2, H.shape[1]))
+
+    pos = np.zeros((len(H), 2))
+    pos[:, :len(cols[:2])] = H[:, cols[:2]]
+    return pos
+
+
+def sample_nodes(nodes, max_nodes, seed=0):
+    """
+    Keeps at most max_nodes of the nodes, chosen uniformly at random
+    (so every cluster keeps about its share), in increasing order.
+    """
+    nodes = np.asarray(nodes)
+    if max_nodes is None or len(nodes) <= max_nodes:
+        return nodes
+
+    rng = np.random.default_rng(seed)
+    return np.sort(rng.choice(nodes, size=max_nodes, replace=False))
+
+
+def sample_edges(edges, max_edges, seed=0):
+    """
+    Keeps at most max_edges of the edges, chosen uniformly at random.
+    """
+    if max_edges is None or len(edges) <= max_edges:
+        return edges
+
+    rng = np.random.default_rng(seed)
+    return edges[np.sort(rng.choice(len(edges), size=max_edges,
+                                    replace=False))]
+
+
+def induced_edges(n, edges, nodes):
+    """
+    Edges between the given nodes, each undirected edge once, with
+    the nodes renumbered by their position in `nodes'.
+    """
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    new_label = np.full(n, -1, dtype=np.int64)
+    new_label[nodes] = np.arange(len(nodes))
+
+    sub = new_label[edges]
+    sub = sub[np.all(sub >= 0, axis=1)]
+    sub = np.sort(sub, axis=1)
+    sub = sub[sub[:, 0] != sub[:, 1]]
+
+    m = max(len(nodes), 1)
+    keys = np.sort(sub[:, 0]*m + sub[:, 1])
+    keys = keys[np.concatenate([[True], keys[1:] != keys[:-1]])[:len(keys)]]
+    return np.stack([keys//m, keys % m], axis=1)
+
+
+def plot_data(n, edges, nodes, layout=None, embedding=None, max_nodes=None,
+              max_edges=None, seed=0, cache_dir=None):
+    """
+    Picks what to draw of a graph: samples the nodes and the edges
+    between them and finds their coordinates.
+
+    Params:
+        n (int): number of vertices in the graph.
+        edges (np.ndarray): |E|*2 matrix, each row is an edge.
+        nodes (np.ndarray): the vertices to draw.
+        layout (np.ndarray): (optional) n*2 coordinates of all the
+                             vertices, e.g. from `get_layout'.
+        embedding (np.ndarray): (optional) n*m spectral embedding used
+                                as coordinates, see `get_layout'.
+        max_nodes (int): (optional) draw at most this many nodes.
+        max_edges (int): (optional) draw at most this many edges.
+        seed (int): (optional) seed of the sampling and the layout.
+        cache_dir (str): (optional) see `get_layout'.
+
+    Returns:
+        nodes (np.ndarray): the vertices drawn.
+        pos (np.ndarray): their coordinates.
+        edges (np.ndarray): the edges drawn, by position in nodes.
+    """
+    nodes = sample_nodes(nodes, max_nodes, seed)
+    sub_edges = induced_edges(n, edges, nodes)
+
+    if layout is not None:
+        pos = np.asarray(layout)[nodes]
+    elif embedding is not None:
+        pos = get_layout(len(nodes), sub_edges,
+                         embedding=np.asarray(embedding)[nodes])
+    else:
+        # the layout of the drawn subgraph only.
+        pos = get_layout(len(nodes), sub_edges, seed=seed,
+                         cache_dir=cache_dir)
+
+    return nodes, pos, sample_edges(sub_edges, max_edges, seed)
+
+
+def cluster_edges(edges, labels, k=None):
+    """
+    Splits the edges inside clusters by cluster, in one pass.
+
+    Params:
+        edges (np.ndarray): |E|*2 matrix, each row is an edge.
+        labels (np.ndarray): array with the cluster of each vertex.
+        k (int): (optional) number of clusters.
+
+    Returns:
+        edges (list): k arrays, the ith holds the edges with both ends
+                      in the ith cluster.
+    """
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    labels = np.asarray(labels)
+    if k is None:
+        k = int(np.max(labels, initial=-1)) + 1
+
+    l_a, l_b = labels[edges[:, 0]], labels[edges[:, 1]]
+    inside = (l_a == l_b) & (l_a >= 0)
+    edges, l_a = edges[inside], l_a[inside]
+
+    order = np.argsort(l_a, kind='stable')
+    bounds = np.cumsum(np.bincount(l_a, minlength=k))[:-1]
+    return np.split(edges[order], bounds)
+
+
+def draw_graph(ax, pos, edges, node_colors, node_size=20, edge_style=':',
+               edge_width=0.5):
+    """
+    Draws the graph on a matplotlib axis with one scatter for the
+    nodes and one line collection for the edges, however many there
+    are.
+
+    Params:
+        ax (matplotlib.axes.Axes): where to draw.
+        pos (np.ndarray): m*2 coordinates of the nodes drawn.
+        edges (np.ndarray): edges between those nodes (by row of pos).
+        node_colors (list): the colour of each node.
+    """
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    if len(edges):
+        ax.add_collection(LineCollection(
+            pos[edges], colors='black', linestyles=edge_style,
+            linewidths=edge_width, zorder=1
+        ))
+    ax.scatter(pos[:, 0], pos[:, 1], c=node_colors, s=node_size, zorder=2)
+    ax.autoscale()
+    ax.set_axis_off()
@@ -1,153 +1,89 @@
 # # Following function pre-procceses the FriendshipNET dataset and returns the list of edges (Nx2 matrix).
 
 import numpy as np
-import copy
 
-def get_friendshipnet_data():
+
+METADATA_PATH = "../data/friendship_net/metadata_2013.txt"
+EDGES_PATH = "../data/friendship_net/Friendship-network_data_2013.csv"
+
+CLASSES = ['2BIO1', '2BIO2', '2BIO3', 'MP*1', 'MP*2', 'PSI*', 'PC', 'PC*',
+           'MP']
+
+
+def get_friendshipnet_data(metadata_path=METADATA_PATH,
+                           edges_path=EDGES_PATH):
 
     """Returns the following in the same order:
-        No_of_Nodes, 
+        No_of_Nodes,
         No_of_connected_nodes,
         edges,
         orphannodes,
         gender_group,
-        reduced_group_list"""
-
-
-    metadata_orig = np.genfromtxt(
-            # "../../data/metadata_2013.txt",
-            "../data/friendship_net/metadata_2013.txt",
-            delimiter="\t",
-            # skip_header=True,
-            dtype="str",
-        )
-        # )[:,0]        #For only first column
-
-
-    edges_orig = np.genfromtxt(
-            # "../../data/Friendship-network_data_2013.csv",
-            "../data/friendship_net/Friendship-network_data_2013.csv",
-            delimiter=" ", 
-            # skip_header=True,
-            # dtype="str",
-        )
-
-
-
-    # edges_orig.shape    #   (668,2)
-    allnodes = np.unique(metadata_orig[:, 0].astype(int))   #329
-    mapping = np.unique(edges_orig)        #only 134 nodes are interconnected
-
-    orphannodes = np.setdiff1d(allnodes, mapping)   #195
-
-    edges = np.copy(edges_orig)
-    metadata = np.copy(metadata_orig[:, 0]).astype(int)
-    for j in np.unique(mapping):
-        indices = np.where(edges[:,0] == j)
-        edges[indices, 0] = np.where(mapping == j)
-        
-        indices = np.where(edges[:,1] == j)
-        edges[indices, 1] = np.where(mapping == j)
-
-        index = np.where(metadata_orig[:,0].astype(float) == float(j))
-        metadata[index] = np.where(mapping == j)
-
-    for j in orphannodes:
-        index = np.where(metadata_orig[:,0].astype(float) == float(j))
-        metadata[index] = np.where(orphannodes == j)
-        metadata[index] += 134
-
-    # metadata now contains relabelled data, with 
-    # values 0 to 133 indicating the nodes which 
-    # are interconnected and indicated by edges, 
-    # all other nodes are numbered 134 and onwards.
-
-    metadata_orig[:, 0] = metadata
-
-    gender_group = [[], []]
-    for i,ID in enumerate(metadata_orig[:, 0]):
-        if metadata_orig[i, 2] == 'F':
-            gender_group[1].append(int(ID))
-        elif metadata_orig[i, 2] == 'M':
-            gender_group[0].append(int(ID))
-        else:
-            gender_group[1].append(int(ID))
-
-
-    class_group = [[], [], [], [], [], [], [], [], []]
-    for i,ID in enumerate(metadata_orig[:, 0]):
-        if metadata_orig[i, 1] == '2BIO1':
-            class_group[0].append(int(ID))        #2BIO1
-
-        elif metadata_orig[i, 1] == '2BIO2':
-            class_group[1].append(int(ID))         #2BIO2
-
-        elif metadata_orig[i, 1] == '2BIO3':
-            class_group[2].append(int(ID))         #2BIO3
-
-        elif metadata_orig[i, 1] == 'MP*1':
-            class_group[3].append(int(ID))         #MP*1
-
-        elif metadata_orig[i, 1] == 'MP*2':
-            class_group[4].append(int(ID))         #MP*2
-
-        elif metadata_orig[i, 1] == 'PSI*':
-            class_group[5].append(int(ID))         #PSI*
-
-        elif metadata_orig[i, 1] == 'PC':
-            class_group[6].append(int(ID))         #PC
-
-        elif metadata_orig[i, 1] == 'PC*':
-            class_group[7].append(int(ID))         #PC*
-
-        elif metadata_orig[i, 1] == 'MP':
-            class_group[8].append(int(ID))         #MP
-            # print("me")
-        else:
-            print(int(ID))
-
-
-
-
-    reduced_gender_group_list = copy.deepcopy(gender_group)
-
-    for j in gender_group[0]:
-        # print(int(j))
-        if int(j) >= 134:
-            # print("removing")
-            reduced_gender_group_list[0].remove(j)
-        
-    for j in gender_group[1]:
-        if int(j) >= 134:
-            reduced_gender_group_list[1].remove(j)
-
-
-
-    reduced_class_group_list = copy.deepcopy(class_group)
-    for k in range(9):
-        for j in class_group[k]:
-            if int(j) >= 134:
-                reduced_class_group_list[k].remove(j) 
-
-
-
+        reduced_group_list,
+        reduced_class_group_list
+
+    All the steps are vectorized, so loading takes linear time
+    (up to sorting) in the number of edges and nodes."""
+
+
+    metadata_orig = np.loadtxt(metadata_path, delimiter="\t", dtype="str",
+                               ndmin=2)
+    edges_orig = np.loadtxt(edges_path, delimiter=" ", ndmin=2)
+
+    allnodes = np.unique(metadata_orig[:, 0].astype(int))
+    # the interconnected nodes are numbered in increasing order of
+    # their ID, the edges get the new numbers in the same step.
+    mapping, inverse = np.unique(edges_orig, return_inverse=True)
+    edges = inverse.reshape(edges_orig.shape)
+
+    orphannodes = np.setdiff1d(allnodes, mapping)
+    num_connected = len(mapping)
+
+    # metadata now contains relabelled data, with values 0 to
+    # num_connected-1 indicating the nodes which are interconnected
+    # and indicated by edges, all other nodes are numbered
+    # num_connected and onwards.
+    ids = metadata_orig[:, 0].astype(float)
+    pos = np.minimum(np.searchsorted(mapping, ids), num_connected - 1)
+    connected = mapping[pos] == ids
+    metadata = np.where(connected, pos,
+                        num_connected + np.searchsorted(orphannodes, ids))
+
+    gender = metadata_orig[:, 2]
+    gender_group = [metadata[gender == 'M'].tolist(),
+                    metadata[gender != 'M'].tolist()]
+
+    classes = metadata_orig[:, 1]
+    class_group = [metadata[classes == c].tolist() for c in CLASSES]
+    for ID in metadata[~np.isin(classes, CLASSES)]:
+        print(int(ID))
+
+    reduced_gender_group_list = [
+        metadata[(gender == 'M') & connected].tolist(),
+        metadata[(gender != 'M') & connected].tolist(),
+    ]
+    reduced_class_group_list = [metadata[(classes == c) & connected].tolist()
+                                for c in CLASSES]
 
     No_of_Nodes = len(orphannodes) + len(mapping)
     No_of_connected_nodes = len(mapping)
 
-    edges = edges.astype(np.int32)
+    edges = _add_reverse_edges(edges.astype(np.int32), num_connected)
 
-    listofedges = edges.tolist()
-    for (index, element) in enumerate(edges[:,0]):
-        j = edges[index,1]
-        for k in range(edges.shape[0]):
-            if all(edges[k]==[j, element]):
-                break
+    return No_of_Nodes, No_of_connected_nodes, edges, orphannodes, gender_group, reduced_gender_group_list, reduced_class_group_list
 
-        else:
-            listofedges.append([j, element])
 
-    edges = np.array(listofedges, dtype=np.int32)
+def _add_reverse_edges(edges, n):
+    """
+    Appends the edge (j, i), after all the edges, for every edge
+    (i, j) whose reverse is not already in the list.
+    """
+    keys = edges[:, 0].astype(np.int64)*n + edges[:, 1]
+    reverse_keys = edges[:, 1].astype(np.int64)*n + edges[:, 0]
 
-    return No_of_Nodes, No_of_connected_nodes, edges, orphannodes, gender_group, reduced_gender_group_list, reduced_class_group_list
+    sorted_keys = np.sort(keys)
+    pos = np.minimum(np.searchsorted(sorted_keys, reverse_keys),
+                     len(keys) - 1)
+    missing = sorted_keys[pos] != reverse_keys
 
+    return np.concatenate([edges, edges[missing][:, ::-1]])
@@ -0,0 +1,188 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from matplotlib.figure import Figure
+
+from . import layout as layout_
+
+
+# colours of the clusters and, in the second figure, of the groups.
+# The last one is for unlabelled (-1) vertices.
+CLUSTER_COLORS = np.array(['blue', 'red', 'cyan', 'green', 'magenta',
+                           'black', 'grey', 'yellow', 'brown', 'lightgrey'])
+GROUP_COLORS = np.array(['green', 'red', 'yellow', 'magenta', 'gray',
+                         'black', 'white'])
+
+FORMATS = ('png', 'svg', 'pdf')
+
+# the graph drawn by the worker processes of `save_figures'.
+_GRAPH = {}
+
+
+def draw_clusters(fig, pos, edges, clusters, title='', node_size=20,
+                  edge_style=':'):
+    """
+    Draws the graph on fig with each cluster in a different colour.
+
+    Params:
+        fig (matplotlib.figure.Figure): the figure to draw on.
+        pos (np.ndarray): m*2 coordinates of the nodes drawn.
+        edges (np.ndarray): edges between those nodes (by row of pos).
+        clusters (np.ndarray): the cluster of each node drawn (-1 for
+                               none).
+        title (str): (optional) title of the figure.
+
+    Warnings:
+        Throws error if there are more clusters than colours.
+    """
+    assert np.max(clusters, initial=-1) < len(CLUSTER_COLORS) - 1, \
+        "more clusters than colours given."
+
+    ax = fig.add_subplot()
+    if title:
+        fig.suptitle(title)
+    layout_.draw_graph(ax, pos, edges, CLUSTER_COLORS[clusters],
+                       node_size=node_size, edge_style=edge_style)
+
+
+def draw_groups(fig, pos, edges, clusters, groups, title=''):
+    """
+    Draws one panel per cluster on fig, with its nodes coloured by
+    group and the edges inside it.
+
+    Params:
+        fig (matplotlib.figure.Figure): the figure to draw on.
+        pos (np.ndarray): m*2 coordinates of the nodes drawn.
+        edges (np.ndarray): edges between those nodes (by row of pos).
+        clusters (np.ndarray): the cluster of each node drawn (-1 for
+                               none).
+        groups (np.ndarray): the group of each node drawn (-1 for
+                             none).
+        title (str): (optional) title of the figure.
+
+    Warnings:
+        Throws error if there are more groups than colours.
+    """
+    assert np.max(groups, initial=-1) < len(GROUP_COLORS) - 1, \
+        "not enough colors to label with."
+
+    num_clusters = int(np.max(clusters, initial=-1)) + 1
+    if title:
+        fig.suptitle(title)
+    if num_clusters == 0:
+        return
+    axes = fig.subplots(1, num_clusters, squeeze=False)[0]
+
+    # renumbers the edges by position among the cluster's nodes.
+    position = np.zeros(len(pos), dtype=np.int64)
+    for i, (ax, c_edges) in enumerate(zip(
+            axes, layout_.cluster_edges(edges, clusters, num_clusters))):
+        in_cluster = np.flatnonzero(clusters == i)
+        position[in_cluster] = np.arange(len(in_cluster))
+        layout_.draw_graph(ax, pos[in_cluster], position[c_edges],
+                           GROUP_COLORS[groups[in_cluster]], edge_width=0.1)
+
+
+def save_figure(fig, path, dpi=100):
+    """
+    Writes a figure to a file, in the format given by the extension of
+    path (one of FORMATS).
+    """
+    ext = os.path.splitext(path)[1][1:].lower()
+    assert ext in FORMATS, "unsupported figure format: {}".format(ext)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fig.savefig(path, format=ext, dpi=dpi)
+
+
+def save_figures(n, edges, jobs, layout=None, embedding=None,
+                 max_nodes=None, max_edges=None, seed=0, cache_dir=None,
+                 n_jobs=1, dpi=100):
+    """
+    Renders the clusterings of one graph to image files, without a
+    display.
+
+    The figures are matplotlib Figure objects drawn with the Agg
+    backend, independently of pyplot, so this can run anywhere (in a
+    script, a job without a display, a worker process). The nodes
+    drawn and their layout are computed once and shared by all the
+    figures; with n_jobs > 1 they are sent once to each worker process
+    and the figures are rendered in parallel.
+
+    Params:
+        n (int): number of vertices in the graph.
+        edges (np.ndarray): |E|*2 matrix, each row is an edge.
+        jobs (list): one dict per figure, with keys
+                     'path' -> the file to write (.png, .svg or .pdf),
+                     'clusters' -> array of cluster labels or list of
+                                   list of vertices,
+                     'groups' -> (optional) the groups in the same
+                                 form, draws the clusters coloured by
+                                 group instead (as in the second
+                                 figure of `utils.visualizeGroups'),
+                     'title' -> (optional) title of the figure.
+        layout, embedding, max_nodes, max_edges, seed, cache_dir:
+            (optional) see `utils.visualize'.
+        n_jobs (int): (optional) number of worker processes.
+        dpi (int): (optional) resolution of the png files.
+
+    Returns:
+        paths (list): the files written, in the order of jobs.
+    """
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    # isolated vertices are not drawn.
+    connected = np.flatnonzero(np.bincount(edges.reshape(-1), minlength=n))
+    nodes, pos, sub_edges = layout_.plot_data(
+        n, edges, connected, layout, embedding, max_nodes, max_edges,
+        seed, cache_dir
+    )
+
+    # only the labels of the drawn nodes are sent to the workers.
+    tasks = []
+    for job in jobs:
+        groups = job.get('groups')
+        tasks.append((
+            job['path'], _labels(job['clusters'], n)[nodes],
+            None if groups is None else _labels(groups, n)[nodes],
+            job.get('title', ''), dpi
+        ))
+
+    if n_jobs == 1:
+        _init_worker(pos, sub_edges)
+        try:
+            return [_render(task) for task in tasks]
+        finally:
+            _GRAPH.clear()
+
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                             initargs=(pos, sub_edges)) as pool:
+        return list(pool.map(_render, tasks))
+
+
+def _labels(x, n):
+    if isinstance(x, np.ndarray) and x.ndim == 1:
+        return x
+    labels = np.full(n, -1, dtype=np.int64)
+    for i, c in enumerate(x):
+        labels[np.asarray(c, dtype=np.int64)] = i
+    return labels
+
+
+def _init_worker(pos, edges):
+    _GRAPH['pos'] = pos
+    _GRAPH['edges'] = edges
+
+
+def _render(task):
+    path, clusters, groups, title, dpi = task
+    fig = Figure()
+    if groups is None:
+        draw_clusters(fig, _GRAPH['pos'], _GRAPH['edges'], clusters, title)
+    else:
+        draw_groups(fig, _GRAPH['pos'], _GRAPH['edges'], clusters, groups,
+                    title)
+    save_figure(fig, path, dpi)
+    return path
@@ -0,0 +1,245 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import numpy as np
+import scipy.sparse as sp
+
+
+# the pairs of each pair of blocks are split into tasks of about this
+# many expected edges, which bounds the memory used by a task.
+CHUNK_EDGES = 1 << 22
+
+
+def sample_sbm(block_sizes, probs, seed=None, vertices=None, sparse=False,
+               out=None, n_jobs=1):
+    """
+    Samples an undirected graph from a stochastic block model.
+
+    Every pair of vertices is an edge independently, with the
+    probability given by the blocks of its two ends. Instead of
+    drawing one number per pair, the number of edges of each pair of
+    blocks is drawn from a binomial distribution and that many
+    distinct pairs are chosen at once, so the cost is proportional to
+    the number of edges.
+
+    The pairs of every pair of blocks are split into tasks of at most
+    about CHUNK_EDGES edges. The edge counts of all the tasks are
+    drawn first, which fixes where each task writes its edges, and
+    each task then samples its pairs with its own generator spawned
+    from the seed. The graph therefore only depends on the seed, not
+    on n_jobs or on whether it is written to a file.
+
+    Params:
+        block_sizes (list): number of vertices in each block.
+        probs (np.ndarray): B*B symmetric matrix, ijth entry is the
+                            probability of an edge between a vertex of
+                            block i and one of block j.
+        seed (int, np.random.SeedSequence or np.random.Generator):
+            (optional) seed.
+        vertices (np.ndarray): (optional) the vertices of the blocks,
+                               block after block (defaults to 0..n-1
+                               in order).
+        sparse (bool): (optional) return a CSR adjacency matrix
+                       instead of the list of edges.
+        out (str): (optional) path of a .npy file the edges are
+                   streamed to, for graphs that do not fit in memory.
+                   The tasks then run in worker processes and the
+                   edges are returned memory-mapped.
+        n_jobs (int): (optional) number of tasks run in parallel
+                      (threads, or processes with out).
+
+    Returns:
+        edges (np.ndarray): |E|*2 array of np.int32's with every edge
+                            listed in both directions (or an n*n
+                            scipy.sparse.csr_matrix if sparse).
+
+    Warnings:
+        Throws error if probs is not symmetric or does not match
+        block_sizes, or if both sparse and out are given.
+    """
+    block_sizes = np.asarray(block_sizes, dtype=np.int64)
+    probs = np.asarray(probs, dtype=np.float64)
+    num_blocks = len(block_sizes)
+    n = int(np.sum(block_sizes))
+
+    assert probs.shape == (num_blocks, num_blocks), \
+        "probs must be a (no. of blocks)*(no. of blocks) matrix"
+    assert np.allclose(probs, probs.T), "probs must be symmetric"
+    assert not (sparse and out is not None), \
+        "sparse output cannot be written to a file"
+
+    tasks, num_edges = _make_tasks(block_sizes, probs, _seed_sequence(seed))
+    offsets = np.concatenate([[0], np.cumsum(block_sizes)])
+
+    if out is None:
+        edges = np.empty((2*num_edges, 2), dtype=np.int32)
+        with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+            list(pool.map(
+                lambda task: _sample_task(edges, num_edges, vertices,
+                                          offsets, block_sizes, task),
+                tasks
+            ))
+    else:
+        edges = _sample_to_file(out, tasks, num_edges, vertices, offsets,
+                                block_sizes, n_jobs)
+
+    if sparse:
+        data = np.ones(len(edges))
+        return sp.csr_matrix((data, (edges[:, 0], edges[:, 1])),
+                             shape=(n, n))
+
+    return edges
+
+
+def _seed_sequence(seed):
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    if isinstance(seed, np.random.Generator):
+        return np.random.SeedSequence(int(seed.integers(2**63)))
+    return np.random.SeedSequence(seed)
+
+
+def _make_tasks(block_sizes, probs, seed_seq):
+    """
+    Splits the pairs of every pair of blocks into ranges and draws the
+    number of edges in each range. Returns the tasks
+    (r, s, first pair, no. of pairs, no. of edges, first row, seed)
+    and the total number of edges.
+    """
+    count_rng = np.random.default_rng(seed_seq)
+    num_blocks = len(block_sizes)
+
+    ranges = []
+    for r in range(num_blocks):
+        for s in range(r, num_blocks):
+            p = min(probs[r, s], 1)
+            if r == s:
+                num_pairs = block_sizes[r]*(block_sizes[r] - 1)//2
+            else:
+                num_pairs = block_sizes[r]*block_sizes[s]
+            if num_pairs == 0 or p <= 0:
+                continue
+
+            step = int(max(1, min(num_pairs, CHUNK_EDGES/p)))
+            for lo in range(0, num_pairs, step):
+                ranges.append((r, s, lo, min(step, num_pairs - lo), p))
+
+    counts = count_rng.binomial([length for _, _, _, length, _ in ranges],
+                                [p for _, _, _, _, p in ranges])
+    starts = np.concatenate([[0], np.cumsum(counts)])
+
+    tasks = [(r, s, lo, length, int(m), int(start), child)
+             for (r, s, lo, length, _), m, start, child
+             in zip(ranges, counts, starts, seed_seq.spawn(len(ranges)))]
+    return tasks, int(starts[-1])
+
+
+def _sample_task(edges, num_edges, vertices, offsets, block_sizes, task):
+    """
+    Samples the edges of one task and writes them at its rows of
+    `edges', and reversed num_edges rows further down.
+    """
+    r, s, lo, length, m, start, seed_seq = task
+    if m == 0:
+        return
+
+    rng = np.random.default_rng(seed_seq)
+    idx = lo + _distinct(rng, length, m)
+    if r == s:
+        i, j = _triu_pairs(idx, block_sizes[r])
+    else:
+        i, j = idx//block_sizes[s], idx % block_sizes[s]
+
+    u, v = offsets[r] + i, offsets[s] + j
+    if vertices is not None:
+        u, v = vertices[u], vertices[v]
+
+    edges[start:start+m, 0] = u
+    edges[start:start+m, 1] = v
+    edges[num_edges+start:num_edges+start+m, 0] = v
+    edges[num_edges+start:num_edges+start+m, 1] = u
+
+
+def _sample_to_file(out, tasks, num_edges, vertices, offsets, block_sizes,
+                    n_jobs):
+    edges = np.lib.format.open_memmap(out, mode='w+', dtype=np.int32,
+                                      shape=(2*num_edges, 2))
+    del edges
+
+    # the workers read the vertices from a file rather than getting a
+    # copy of them with every task.
+    vertices_file = None
+    if vertices is not None:
+        fd, vertices_file = tempfile.mkstemp(
+            suffix='.npy', dir=os.path.dirname(os.path.abspath(out))
+        )
+        os.close(fd)
+        np.save(vertices_file, np.asarray(vertices))
+
+    try:
+        args = (out, vertices_file, num_edges, offsets, block_sizes)
+        if n_jobs == 1:
+            for task in tasks:
+                _sample_task_to_file(*args, task)
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+                list(pool.map(_sample_task_to_file,
+                              *zip(*[args + (task,) for task in tasks])))
+    finally:
+        if vertices_file is not None:
+            os.remove(vertices_file)
+
+    return np.load(out, mmap_mode='r')
+
+
+def _sample_task_to_file(out, vertices_file, num_edges, offsets,
+                         block_sizes, task):
+    edges = np.load(out, mmap_mode='r+')
+    vertices = None if vertices_file is None \
+        else np.load(vertices_file, mmap_mode='r')
+    _sample_task(edges, num_edges, vertices, offsets, block_sizes, task)
+    edges.flush()
+
+
+def _distinct(rng, num, m):
+    """
+    m distinct integers drawn uniformly from [0, num), using O(m)
+    memory.
+    """
+    if m > num//2:
+        # draw the ones left out instead.
+        keep = np.ones(num, dtype=bool)
+        keep[_distinct(rng, num, num - m)] = False
+        return np.flatnonzero(keep)
+
+    idx = _sorted_unique(rng.integers(num, size=m))
+    while len(idx) < m:
+        more = rng.integers(num, size=m - len(idx))
+        idx = _sorted_unique(np.concatenate([idx, more]))
+    return idx
+
+
+def _sorted_unique(x):
+    # np.unique, which is much slower on large integer arrays.
+    x = np.sort(x, axis=None)
+    return x[np.concatenate([[True], x[1:] != x[:-1]])]
+
+
+def _triu_pairs(idx, size):
+    """
+    Maps indices of the pairs (i, j), i < j, of a block of `size'
+    vertices, numbered row by row, back to (i, j).
+    """
+    def row_start(i):
+        return i*(2*size - i - 1)//2
+
+    b = 2*size - 1
+    i = np.floor((b - np.sqrt(b*b - 8.0*idx))/2).astype(np.int64)
+    # fix the rounding of the square root.
+    i = np.clip(i, 0, size - 2)
+    i -= row_start(i) > idx
+    i += row_start(i + 1) <= idx
+
+    j = idx - row_start(i) + i + 1
+    return i, j
@@ -1,10 +1,16 @@
 import numpy as np
+import scipy.sparse as sp
 import networkx as nx
 import matplotlib.pyplot as plt
-import itertools
+from scipy.optimize import linear_sum_assignment
 
+from . import layout as layout_
+from . import render
+from .sbm import sample_sbm, _seed_sequence
 
-def genGraph(n, cluster_sizes, p, q):
+
+def genGraph(n, cluster_sizes, p, q, seed=None, sparse=False, out=None,
+             n_jobs=1):
     """
     Generates random graph
 
@@ -14,77 +20,83 @@ def genGraph(n, cluster_sizes, p, q):
                                 the graph (must add up to n)
             p (float): probability of an edge within the cluster.
             q (float): probability of an edge between clusters.
+            seed (int or np.random.SeedSequence): (optional) seed.
+            sparse (bool): (optional) return the adjacency matrix in
+                           CSR format instead of the edges.
+            out (str): (optional) .npy file the edges are streamed to
+                       by worker processes, see `sbm.sample_sbm'.
+            n_jobs (int): (optional) number of parallel workers.
 
     Returns:
         edges (np.ndarray): |E|*2 matrix with each rows representing an edge
+                            (each undirected edge appears in both directions)
         clusters (list): list of list of clusters forming the true clusters.
     """
     assert sum(cluster_sizes) == n, \
         "sum of cluster sizes is not equal to the number of vertices"
 
+    perm_seed, edge_seed = _seed_sequence(seed).spawn(2)
+    rng = np.random.default_rng(perm_seed)
+    permuted_vertices = rng.permutation(n).astype(np.int32)
+    clusters = _split(permuted_vertices, cluster_sizes)
 
-    vertices = np.arange(n, dtype=np.int32)
-    clusters = []
-
-    permuted_vertices = np.random.permutation(vertices)
-
-    # get cumulative cluster sizes.
-    l_index = 0
+    k = len(cluster_sizes)
+    probs = np.full((k, k), q, dtype=np.float64)
+    np.fill_diagonal(probs, p)
 
-    for i in range(len(cluster_sizes)-1):
-        r_index = l_index + cluster_sizes[i+1]
-        cluster = permuted_vertices[l_index:r_index]
-        clusters.append(cluster)
-        l_index = r_index
-    clusters.append(permuted_vertices[l_index:])
+    edges = sample_sbm(cluster_sizes, probs, seed=edge_seed,
+                       vertices=permuted_vertices, sparse=sparse,
+                       out=out, n_jobs=n_jobs)
 
-    edges = []
+    return edges, clusters
 
-    for i in vertices:
-        for j in vertices:
-            if i != j:
-                for c in clusters:
-                    if i in c and j in c:
-                        if np.random.random_sample()<p:
-                            edges.append(np.array([i,j], dtype=np.int32))
-                            break
-                else:
-                    if np.random.random_sample()<q:
-                        edges.append(np.array([i,j], dtype=np.int32))
 
-    return np.array(edges), clusters
+def _split(vertices, sizes):
+    return np.split(vertices, np.cumsum(sizes)[:-1])
 
 
-def visualize(n, edges, clusters=[]):
+def visualize(n, edges, clusters=[], layout=None, embedding=None,
+              max_nodes=None, max_edges=None, seed=0, cache_dir=None):
     """
     displays the graph with clusters labelled
 
+    (`render.save_figures' writes the same figure to a file without
+    a display.)
+
     Params:
         n (int): number of vertices in the graph
         edges (np.ndarray): |E|*2 matrix with each row representing
                             an edge.
         clusters (list): (optional) list of, list of vertices
-                         forming the clusters.
+                         forming the clusters (or array of cluster
+                         labels).
+        layout (np.ndarray): (optional) n*2 coordinates of the
+                             vertices, see `layout.get_layout'.
+        embedding (np.ndarray): (optional) spectral embedding used as
+                                coordinates instead of a layout.
+        max_nodes (int): (optional) draw a random sample of at most
+                         this many vertices.
+        max_edges (int): (optional) draw at most this many edges.
+        seed (int): (optional) seed of the sampling and the layout.
+        cache_dir (str): (optional) where layouts are kept between
+                         runs.
 
     Returns:
         None
     """
-    assert len(clusters)<7, "more clusters than colours given."
-
-    vertices = range(n)
-    G = nx.Graph()
-    G.add_edges_from(edges)
-    G.remove_nodes_from(list(nx.isolates(G)))
-    pos=nx.spring_layout(G)
-    colors = ['blue', 'red', 'cyan', 'green', 'magenta', 'black']
-
-
-    for i,c in enumerate(clusters):
-        nx.draw_networkx(
-            G, pos=pos, nodelist=c,
-            node_color=colors[i],
-            with_labels=False
-        )
+    labels = np.asarray(clusters) if _is_labels(clusters) \
+        else clusters_to_labels(clusters, n)
+
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    # isolated vertices are not drawn.
+    connected = np.flatnonzero(np.bincount(edges.reshape(-1), minlength=n))
+    nodes, pos, sub_edges = layout_.plot_data(
+        n, edges, connected, layout, embedding, max_nodes, max_edges,
+        seed, cache_dir
+    )
+
+    render.draw_clusters(plt.figure(), pos, sub_edges, labels[nodes],
+                         edge_style='-')
     plt.show()
 
 
@@ -107,26 +119,76 @@ def genGroups(n, etas, clusters):
     assert sum(etas)==1, "sum of fractions should add up to 1"
     h = len(etas)
     groups = [[] for i in range(h)]
-    _eta_cumul = etas.copy()
-
-    for i in range(h-1):
-        _eta_cumul[i+1] = _eta_cumul[i]+etas[i+1]
 
     for cluster in clusters:
-        c = len(cluster)
-        group = 0
-        for i in range(c):
-            if i < _eta_cumul[group]*c:
-                groups[group].append(cluster[i])
-
-            else:
-                group += 1
-                groups[group].append(cluster[i])
+        positions = _group_positions(len(cluster), etas)
+        for group in range(h):
+            groups[group].extend(
+                np.asarray(cluster)[positions == group].tolist()
+            )
 
     return groups
 
 
-def get_num_cuts(edges, cluster):
+def _group_positions(c, etas):
+    """
+    Group of each position of a cluster of c vertices: the first
+    etas[0]*c positions go to group 0, the next etas[1]*c to group 1,
+    and so on.
+    """
+    bounds = np.cumsum(etas)*c
+    positions = np.searchsorted(bounds, np.arange(c), side='right')
+    return np.minimum(positions, len(etas) - 1)
+
+
+def clusters_to_labels(clusters, n):
+    """
+    Converts a list of clusters (or groups) to a label array.
+
+    Params:
+        clusters (list): list of list of vertices forming clusters.
+        n (int): number of vertices in the graph.
+
+    Returns:
+        labels (np.ndarray): array of n int32's, ith entry is the
+                             cluster of vertex i (-1 if it is in
+                             no cluster).
+    """
+    labels = np.full(n, -1, dtype=np.int32)
+    for i, cluster in enumerate(clusters):
+        labels[np.asarray(cluster, dtype=np.int64)] = i
+    return labels
+
+
+def labels_to_clusters(labels, k=None):
+    """
+    Converts a label array to a list of clusters.
+
+    Params:
+        labels (np.ndarray): array of ints, ith entry is the cluster
+                             of vertex i (negative for no cluster).
+        k (int): (optional) number of clusters, defaults to
+                 max(labels)+1.
+
+    Returns:
+        clusters (list): list of k lists of vertices.
+    """
+    labels = np.asarray(labels)
+    if k is None:
+        k = int(labels.max()) + 1 if len(labels) else 0
+
+    vertices = np.flatnonzero(labels >= 0)
+    order = vertices[np.argsort(labels[vertices], kind='stable')]
+    bounds = np.cumsum(np.bincount(labels[vertices], minlength=k))[:-1]
+    return [c.tolist() for c in np.split(order, bounds)]
+
+
+def _is_labels(clusters):
+    # a label array is a 1-d np.ndarray; clusters are given as lists.
+    return isinstance(clusters, np.ndarray) and clusters.ndim == 1
+
+
+def get_num_cuts(edges, cluster, labels=None):
     """
     Gives the cut of a cluster (no. of edges to be removed for
     the collection of vertices to become isolated from the rest
@@ -135,22 +197,123 @@ def get_num_cuts(edges, cluster):
     Params:
         edges (np.ndarray): |E|*2 matrix, each row is an
                             edge.
+        cluster (list or int): vertices of the cluster, or the
+                               cluster number if labels is given.
+        labels (np.ndarray): (optional) array with the cluster of
+                             each vertex.
 
     Returns:
         cuts (int): the number of cuts for the cluster.
     """
-    cuts = 0
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+
+    if labels is not None:
+        in_cluster = np.asarray(labels) == cluster
+    else:
+        cluster = np.asarray(cluster, dtype=np.int64)
+        n = max(edges.max(initial=-1), cluster.max(initial=-1)) + 1
+        in_cluster = np.zeros(n, dtype=bool)
+        in_cluster[cluster] = True
+
+    a_in = in_cluster[edges[:, 0]]
+    b_in = in_cluster[edges[:, 1]]
+    return int(np.sum(a_in != b_in))
+
+
+# edges are processed in chunks of this many rows, so that edge
+# arrays that are memory-mapped are never loaded as a whole.
+EDGE_CHUNK_SIZE = 1 << 22
+
+
+def _edge_label_chunks(edges, labels, weights):
+    for start in range(0, len(edges), EDGE_CHUNK_SIZE):
+        chunk = np.asarray(edges[start:start+EDGE_CHUNK_SIZE],
+                           dtype=np.int64)
+        w = None if weights is None \
+            else np.asarray(weights[start:start+EDGE_CHUNK_SIZE])
+        yield labels[chunk[:, 0]], labels[chunk[:, 1]], w
+
+
+def get_cuts(edges, labels, k=None, weights=None):
+    """
+    Gives the cuts of all the clusters at once, in one vectorized
+    pass over the edges. The ith entry equals
+    get_num_cuts(edges, i, labels).
 
-    for edge in edges:
-        a, b = edge[0], edge[1]
+    Params:
+        edges (np.ndarray): |E|*2 matrix, each row is an edge.
+        labels (np.ndarray): array with the cluster of each vertex
+                             (-1 for vertices in no cluster).
+        k (int): (optional) number of clusters, defaults to
+                 max(labels)+1.
+        weights (np.ndarray): (optional) weight of each edge.
 
-        if a in cluster and b not in cluster:
-            cuts += 1
+    Returns:
+        cuts (np.ndarray): k entries, the (weighted) number of edges
+                           with exactly one end in each cluster.
+    """
+    return get_cut_metrics(edges, labels, k, weights)[0]
 
-        if a not in cluster and b in cluster:
-            cuts += 1
 
-    return cuts
+def get_cut_metrics(edges, labels, k=None, weights=None):
+    """
+    Gives the cut of each cluster, the ratio cut and the normalized
+    cut of a clustering in one vectorized pass over the edges.
+
+    Each row of `edges' counts as one edge, for both of its ends:
+
+        cut(C) = (weighted) number of edges with exactly one end in C,
+        vol(C) = sum of the (weighted) degrees of the vertices in C,
+        ratio cut = sum over the clusters of cut(C)/|C|,
+        normalized cut = sum over the clusters of cut(C)/vol(C).
+
+    An undirected edge listed in both directions, as the clustering
+    functions take it, is counted twice: the cuts, the volumes and the
+    ratio cut are doubled, and the normalized cut is unchanged.
+
+    Params:
+        edges (np.ndarray): |E|*2 matrix, each row is an edge.
+        labels (np.ndarray): array with the cluster of each vertex
+                             (-1 for vertices in no cluster).
+        k (int): (optional) number of clusters, defaults to
+                 max(labels)+1.
+        weights (np.ndarray): (optional) weight of each edge.
+
+    Returns:
+        cuts (np.ndarray): k entries, cut(C) of each cluster (int64
+                           without weights).
+        ratio_cut (float): the ratio cut of the clustering.
+        normalized_cut (float): the normalized cut of the clustering.
+
+    Empty clusters contribute 0 to both sums.
+    """
+    labels = np.asarray(labels)
+    if k is None:
+        k = int(labels.max()) + 1
+
+    cuts = np.zeros(k)
+    vols = np.zeros(k)
+    for l_a, l_b, w in _edge_label_chunks(edges, labels, weights):
+        # vertices labelled -1 belong to no cluster.
+        for l_in, l_out in ((l_a, l_b), (l_b, l_a)):
+            inside = l_in >= 0
+            across = (l_in != l_out) & inside
+            cuts += np.bincount(l_in[across],
+                                weights=None if w is None else w[across],
+                                minlength=k)
+            vols += np.bincount(l_in[inside],
+                                weights=None if w is None else w[inside],
+                                minlength=k)
+
+    sizes = np.bincount(labels[labels >= 0], minlength=k)
+    ratio_cut = np.sum(np.divide(cuts, sizes, out=np.zeros(k),
+                                 where=sizes > 0))
+    normalized_cut = np.sum(np.divide(cuts, vols, out=np.zeros(k),
+                                      where=vols > 0))
+
+    if weights is None:
+        cuts = cuts.astype(np.int64)
+    return cuts, float(ratio_cut), float(normalized_cut)
 
 
 def get_group_cluster_matrix(clusters, groups):
@@ -158,24 +321,71 @@ def get_group_cluster_matrix(clusters, groups):
     Gives a C*G matrix whose ijth entry is the number of
     members of group j in the ith cluster.
 
+    The matrix is a contingency table built in O(n): with label
+    arrays by one bincount over (cluster, group) pairs, and with lists
+    of vertices (which may overlap) as the product of two sparse
+    membership matrices.
+
     Params:
-        clusters (list): List of list of vertices forming clusters.
-        groups (list): List of list of vertices belonging to each
-                       groups.
+        clusters (list or np.ndarray): List of list of vertices
+                                       forming clusters, or array of
+                                       cluster labels.
+        groups (list or np.ndarray): List of list of vertices
+                                     belonging to each groups, or
+                                     array of group labels.
 
     Returns:
         mat (np.ndarray): (no. of clusters)*(no. of groups) matrix
                           ij th entry is the number of elements
                           of group j in the ith cluster.
     """
-    mat = np.zeros((len(clusters), len(groups)), dtype=np.int32)
+    if _is_labels(clusters) and _is_labels(groups):
+        return _get_group_cluster_matrix_from_labels(clusters, groups)
+
+    n = max(_num_vertices(clusters), _num_vertices(groups))
+    mat = _membership_mat(clusters, n).T @ _membership_mat(groups, n)
+    return mat.toarray().astype(np.int32)
 
-    for j, group in enumerate(groups):
-        for i, cluster in enumerate(clusters):
-            for v in cluster:
-                if v in group:
-                    mat[i][j] += 1
-    return mat
+
+def _num_vertices(clusters):
+    if _is_labels(clusters):
+        return len(clusters)
+    return max((int(np.max(c)) + 1 for c in clusters if len(c)),
+               default=0)
+
+
+def _membership_mat(clusters, n):
+    """
+    n*C sparse matrix whose ijth entry is 1 if vertex i is in
+    cluster j.
+    """
+    if _is_labels(clusters):
+        k = int(np.max(clusters, initial=-1)) + 1
+        rows = np.flatnonzero(clusters >= 0)
+        cols = clusters[rows]
+    else:
+        k = len(clusters)
+        rows = np.concatenate([np.asarray(c, dtype=np.int64).reshape(-1)
+                               for c in clusters] + [np.zeros(0, int)])
+        cols = np.repeat(np.arange(k), [len(c) for c in clusters])
+    return sp.csr_matrix((np.ones(len(rows), dtype=np.int64),
+                          (rows, cols)), shape=(n, k))
+
+
+def _get_group_cluster_matrix_from_labels(clusters, groups):
+    k = int(np.max(clusters, initial=-1)) + 1
+    h = int(np.max(groups, initial=-1)) + 1
+
+    both = (clusters >= 0) & (groups >= 0)
+    mat = np.bincount(clusters[both].astype(np.int64)*h + groups[both],
+                      minlength=k*h)
+    return mat.reshape(k, h).astype(np.int32)
+
+
+def _nonempty_groups(mat):
+    # groups without any member carry no information about fairness.
+    mat = np.asarray(mat, dtype=np.float64)
+    return mat[:, np.sum(mat, axis=0) > 0]
 
 
 def get_balance(mat):
@@ -189,90 +399,126 @@ def get_balance(mat):
     Returns:
         balance (np.array): array of floats. ith entry is the
                             balance of the ith cluster.
+
+    Groups with no members at all are ignored, and an empty cluster
+    has balance 0.
     """
+    mat = _nonempty_groups(mat)
+    if mat.shape[1] == 0:
+        return np.zeros(len(mat))
+
     max_groups = np.max(mat, axis=1)
     min_groups = np.min(mat, axis=1)
-    balances = (min_groups/max_groups).reshape(-1)
+    balances = np.divide(min_groups, max_groups,
+                         out=np.zeros(len(mat)), where=max_groups > 0)
 
     return balances.reshape(-1)
 
 
+def get_proportional_fairness(mat):
+    """
+    Computes the proportional fairness of each cluster from
+    `group-cluster-matrix': the smallest ratio, over the groups,
+    between the share of a group in the cluster and its share in the
+    whole graph (taken the other way round if larger than 1), so 1
+    means every group is represented as in the graph.
+
+    Params:
+        mat (np.ndarray): matrix with ijth entry being the number
+                          of elements of group j in cluster i.
+
+    Returns:
+        fairness (np.array): array of floats in [0, 1]. ith entry is
+                             the proportional fairness of the ith
+                             cluster.
+
+    Groups with no members at all are ignored, and an empty cluster
+    has fairness 0.
+    """
+    mat = _nonempty_groups(mat)
+    sizes = np.sum(mat, axis=1)
+    if mat.shape[1] == 0:
+        return np.zeros(len(mat))
+
+    overall = np.sum(mat, axis=0)/np.sum(mat)
+    shares = np.divide(mat, sizes[:, None], out=np.zeros(mat.shape),
+                       where=sizes[:, None] > 0)
+    ratios = shares/overall
+    # ratios are 0 only for missing groups, where min(r, 1/r) = 0.
+    ratios = np.minimum(ratios, np.divide(1, ratios,
+                                          out=np.zeros(mat.shape),
+                                          where=ratios > 0))
+    fairness = np.min(ratios, axis=1)
+    fairness[sizes == 0] = 0
+
+    return fairness
+
+
 def _get_group(v, groups):
+    if _is_labels(groups):
+        return groups[v]
+
     for i, group in enumerate(groups):
         if v in group:
             return i
 
 
 def _get_cluster(v, clusters):
+    if _is_labels(clusters):
+        return clusters[v]
+
     for i, cluster in enumerate(clusters):
         if v in cluster:
             return i
 
 
-def visualizeGroups(clusters, groups, edges, title=''):
+def visualizeGroups(clusters, groups, edges, title='', layout=None,
+                    embedding=None, max_nodes=None, max_edges=None, seed=0,
+                    cache_dir=None):
     """
-    !!!!!!!!!!!!!!!!!!!!!!!!!
-    !!! Needs improvement !!!
-    !!!!!!!!!!!!!!!!!!!!!!!!!
-
     Shows two figures:
         1. Each cluster labelled with different color.
         2. Within each cluster, each node labelled (with different
-           color) based on the group membership
+           color) based on the group membership, with the edges
+           inside the cluster.
+
+    Both figures use the same layout. (`render.save_figures' writes
+    them to files without a display.)
 
     Params:
-        clusters (list): List of list of vertices forming clusters.
-        groups (list): list of list of vertices forming groups.
+        clusters (list): List of list of vertices forming clusters
+                         (or array of cluster labels).
+        groups (list): list of list of vertices forming groups
+                       (or array of group labels).
         edges (np.ndarray): |E|*2 matrix, each row is an edge.
-        title (str): Need to figure out how incorporate this!
+        title (str): (optional) title shown above both figures.
+        layout, embedding, max_nodes, max_edges, seed, cache_dir:
+            (optional) see `visualize'.
 
     Returns:
         None
     """
-    assert len(groups) < 7, "not enough colors to label with."
-
-    G = nx.Graph()
-    G.add_edges_from(edges)
-
-    for i, cluster in enumerate(clusters):
-        for v in cluster:
-            G.add_nodes_from(
-                [[v, {'group': _get_group(v, groups),
-                      'cluster': i}]]
-            )
-
-    colors = ['blue', 'red', 'cyan', 'green', 'magenta', 'black', 'grey',
-              'yellow', 'brown']
-
-    c_map_clusters = [colors[node[1]['cluster']]
-                      for node in G.nodes(data=True)]
-    plt.figure(0)
-    plt.title("Clustering")
-    pos=nx.spring_layout(G)
-    nx.draw(G, node_color=c_map_clusters, node_size=200, edgelist=[],
-            pos=pos)
-    nx.draw_networkx_edges(G, pos=pos, style=':', width=0.5)
-
-    plt.figure(1)
-    plt.suptitle("Clusters")
-    pos=nx.spring_layout(G)
-    colors = ['green', 'red', 'yellow', 'magenta', 'gray', 'black']
-    num_clusters = len(clusters)
-
-    for i, c in enumerate(clusters):
-        c_map_groups = [colors[G.nodes[v]['group']]
-                        for v in c]
-        plt.subplot(1 , num_clusters, i+1)
-        nx.draw_networkx(
-            G, pos=pos, nodelist=c,
-            node_color=c_map_groups,
-            with_labels=False,
-            edgelist=[] # not showing the edges
-        )
-        nx.draw_networkx_edges(G, pos=pos, style=':', width=0.1)
-        #ax.plt.gca()
-        #collections[0].set_edgecolor("#000000")
-
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    n = max(_num_vertices(clusters), _num_vertices(groups),
+            int(np.max(edges, initial=-1)) + 1)
+
+    c_labels = np.asarray(clusters) if _is_labels(clusters) \
+        else clusters_to_labels(clusters, n)
+    g_labels = np.asarray(groups) if _is_labels(groups) \
+        else clusters_to_labels(groups, n)
+
+    num_groups = np.max(groups) + 1 if _is_labels(groups) else len(groups)
+    assert num_groups < 7, "not enough colors to label with."
+
+    nodes, pos, sub_edges = layout_.plot_data(
+        n, edges, np.flatnonzero(c_labels >= 0), layout, embedding,
+        max_nodes, max_edges, seed, cache_dir
+    )
+
+    render.draw_clusters(plt.figure(0, clear=True), pos, sub_edges,
+                         c_labels[nodes], title or "Clustering", node_size=50)
+    render.draw_groups(plt.figure(1, clear=True), pos, sub_edges,
+                       c_labels[nodes], g_labels[nodes], title or "Clusters")
     plt.show()
 
 
@@ -316,11 +562,12 @@ def visualizeGroups_old(clusters, groups, edges, title=''):
     plt.suptitle("Clusters")
     colors = ['green', 'red', 'yellow', 'magenta', 'gray', 'black']
     num_clusters = len(clusters)
+    n = max(_num_vertices(clusters), int(np.max(edges, initial=-1)) + 1)
+    all_new_edges = layout_.cluster_edges(
+        edges, clusters_to_labels(clusters, n), num_clusters
+    )
     for i, cluster in enumerate(clusters):
-        new_edges = []
-        for e in edges:
-            if e[0] in cluster and e[1] in cluster:
-                new_edges.append(e)
+        new_edges = all_new_edges[i].tolist()
         G = nx.Graph()
 
         for v in cluster:
@@ -335,7 +582,8 @@ def visualizeGroups_old(clusters, groups, edges, title=''):
     plt.show()
 
 
-def genGraphWithGroups(n, cluster_sizes, etas, a, b, c, d):
+def genGraphWithGroups(n, cluster_sizes, etas, a, b, c, d, seed=None,
+                       sparse=False, out=None, n_jobs=1):
     """
     Generate random graph using a variant of SBM.
     a, b, c, d are probabilities of edges between vertices:
@@ -354,10 +602,17 @@ def genGraphWithGroups(n, cluster_sizes, etas, a, b, c, d):
         b (float): probability of edge between different cluster, same group.
         c (float): probability of edge between same cluster, different group.
         d (float): probability of edge between different cluster, differnt group.
+        seed (int or np.random.SeedSequence): (optional) seed.
+        sparse (bool): (optional) return the adjacency matrix in CSR
+                       format instead of the edges.
+        out (str): (optional) .npy file the edges are streamed to by
+                   worker processes, see `sbm.sample_sbm'.
+        n_jobs (int): (optional) number of parallel workers.
 
     Returns:
         edges (np.ndarray): |E|*2 array of np.int32's. Each row represents
-                            an edge in the graph.
+                            an edge in the graph (each undirected edge
+                            appears in both directions).
         clusters (list): list of list of vertices forming clusters.
         groups (list): list of list of vertices forming groups.
 
@@ -371,66 +626,35 @@ def genGraphWithGroups(n, cluster_sizes, etas, a, b, c, d):
 
     assert sum(etas)==1, "sum of fractions should add up to 1"
 
-    vertices = np.arange(n, dtype=np.int32)
-    clusters = []
-
-    permuted_vertices = np.random.permutation(vertices)
-
-    # get cumulative cluster sizes.
-    l_index = 0
-
-    for i in range(len(cluster_sizes)-1):
-        r_index = l_index + cluster_sizes[i+1]
-        cluster = permuted_vertices[l_index:r_index]
-        clusters.append(cluster)
-        l_index = r_index
-    clusters.append(permuted_vertices[l_index:])
-
-    groups = genGroups(n, etas, clusters)
-
-    edges = []
-
-    # edges with prob a, b, c, d
-    for v1 in vertices:
-        for v2 in vertices:
-            if v1 != v2:
-                for cl in clusters:
-                    if v1 in cl and v2 in cl: # sc
-                        for gr in groups:
-                            if v1 in gr and v2 in gr:
-                                if np.random.random_sample()<a: # sg
-                                    edges.append(
-                                        np.array(
-                                            [v1, v2], dtype=np.int32
-                                        )
-                                    )
-                        else: #sc, not sg
-                            if np.random.random_sample()<c:
-                                edges.append(
-                                    np.array(
-                                        [v1, v2], dtype=np.int32
-                                    )
-                                )
-
-                else: # not sc
-                    for gr in groups:
-                        if v1 in gr and v2 in gr: # sg
-                            if np.random.random_sample()<b:
-                                edges.append(
-                                    np.array(
-                                        [v1, v2], dtype=np.int32
-                                    )
-                                )
-
-                    else: # not sg
-                        if np.random.random_sample()<d:
-                            edges.append(
-                                np.array(
-                                    [v1, v2], dtype=np.int32
-                                )
-                            )
-
-    return np.array(edges), clusters, groups
+    perm_seed, edge_seed = _seed_sequence(seed).spawn(2)
+    rng = np.random.default_rng(perm_seed)
+    permuted_vertices = rng.permutation(n).astype(np.int32)
+    clusters = _split(permuted_vertices, cluster_sizes)
+
+    # blocks are the (cluster, group) pairs, cluster after cluster.
+    # the members of a group are contiguous inside each cluster.
+    k, h = len(cluster_sizes), len(etas)
+    block_sizes = np.concatenate([
+        np.bincount(_group_positions(size, etas), minlength=h)
+        for size in cluster_sizes
+    ])
+    block_cluster = np.repeat(np.arange(k), h)
+    block_group = np.tile(np.arange(h), k)
+
+    same_cluster = block_cluster[:, None] == block_cluster[None, :]
+    same_group = block_group[:, None] == block_group[None, :]
+    probs = np.where(same_cluster,
+                     np.where(same_group, a, c),
+                     np.where(same_group, b, d))
+
+    edges = sample_sbm(block_sizes, probs, seed=edge_seed,
+                       vertices=permuted_vertices, sparse=sparse,
+                       out=out, n_jobs=n_jobs)
+
+    blocks = _split(permuted_vertices, block_sizes)
+    groups = [np.concatenate(blocks[g::h]).tolist() for g in range(h)]
+
+    return edges, clusters, groups
 
 
 def getMisclassificationMat(clusters1, clusters2):
@@ -440,57 +664,158 @@ def getMisclassificationMat(clusters1, clusters2):
     the ith cluster based on the first clustering and the jth
     cluster based on the second clustering.
 
+    The matrix is computed from the contingency table of the two
+    clusterings as |C1[i]| + |C2[j]| - 2|C1[i] & C2[j]|.
+
     Params:
-        cluster1 (list): list of list of vertices forming cluster1.
-        cluster2 (list): list of list of vertices forming cluster2.
+        cluster1 (list): list of list of vertices forming cluster1
+                         (or array of cluster labels).
+        cluster2 (list): list of list of vertices forming cluster2
+                         (or array of cluster labels).
 
     Returns:
         mis_mat (np.ndarray): ijth entry is the number of elements
                               in the symmetric difference of
                               cluster1[i] and cluster2[j].
-
-    Warnings:
-        Throws an error if the two clusterings have different number
-        of clusters.
     """
-    assert len(clusters1) == len(clusters2), "number of clusters must be same"
-    num = len(clusters1)
-
-    cs1 = [set(x) for x in clusters1]
-    cs2 = [set(x) for x in clusters2]
+    table = get_group_cluster_matrix(clusters1, clusters2)
+    sizes1 = _cluster_sizes(clusters1, table.shape[0])
+    sizes2 = _cluster_sizes(clusters2, table.shape[1])
 
-    mis_mat = np.zeros((num, num), dtype=np.int32)
+    mis_mat = sizes1[:, None] + sizes2[None, :] - 2*table
+    return mis_mat.astype(np.int32)
 
-    for i in range(num):
-        s1 = cs1[i]
-        for j in range(num):
-            s2 = cs2[j]
-            mis_num = len(s1.symmetric_difference(s2))
-            mis_mat[i][j] = mis_num
 
-    return mis_mat
+def _cluster_sizes(clusters, k):
+    if _is_labels(clusters):
+        return np.bincount(clusters[clusters >= 0], minlength=k)
+    return np.array([len(c) for c in clusters], dtype=np.int64)
 
 
 def getMisclassificationError(mat):
-    positions = range(mat.shape[0])
+    """
+    Gives the smallest value of sum(mat[i][perm[i]])/sum(mat) over the
+    matchings perm of the rows of `mat' to its columns. The optimal
+    matching is found with the Hungarian algorithm in O(k^3) instead
+    of trying all the k! permutations, and the matrix may have more
+    rows than columns or the other way round (the extra clusters are
+    left unmatched).
+
+    Params:
+        mat (np.ndarray): misclassification matrix, see
+                          `getMisclassificationMat'.
+
+    Returns:
+        error (float): the misclassification error.
+    """
+    mat = np.asarray(mat)
     total_vertices = np.sum(mat)
+    if total_vertices == 0:
+        return 0
 
-    error = 1
+    rows, cols = linear_sum_assignment(mat)
+    error = np.sum(mat[rows, cols])/total_vertices
 
-    for perm in itertools.permutations(positions):
-        val = 0
-        for i in positions:
-            val += mat[i][perm[i]]
+    return min(error, 1)
 
-        this_error = val/total_vertices
 
-        if this_error < error:
-            error = this_error
+def get_misclassification_rate(clusters1, clusters2):
+    """
+    Gives the fraction of vertices that are misclassified by the
+    first clustering with respect to the second (the ground truth)
+    under the best one-to-one matching of their clusters. With
+    different numbers of clusters, the vertices of the clusters left
+    unmatched count as misclassified.
 
-    return error
+    Params:
+        cluster1 (list): list of list of vertices forming cluster1
+                         (or array of cluster labels).
+        cluster2 (list): list of list of vertices forming cluster2
+                         (or array of cluster labels).
 
+    Returns:
+        rate (float): fraction of misclassified vertices, in [0, 1].
+    """
+    table = get_group_cluster_matrix(clusters1, clusters2)
+    n = np.sum(table)
+    if n == 0:
+        return 0.0
+
+    rows, cols = linear_sum_assignment(table, maximize=True)
+    return 1 - np.sum(table[rows, cols])/n
 
 
+def _pairs(x):
+    # number of pairs among x elements.
+    x = np.asarray(x, dtype=np.float64)
+    return np.sum(x*(x - 1)/2)
+
+
+def get_adjusted_rand_index(clusters1, clusters2):
+    """
+    Gives the adjusted Rand index of two clusterings (1 for identical
+    partitions, about 0 for independent ones), from their contingency
+    table.
+
+    Params:
+        cluster1 (list): list of list of vertices forming cluster1
+                         (or array of cluster labels).
+        cluster2 (list): list of list of vertices forming cluster2
+                         (or array of cluster labels).
+
+    Returns:
+        ari (float): the adjusted Rand index.
+    """
+    table = get_group_cluster_matrix(clusters1, clusters2)
+    n = np.sum(table)
 
-    pass
+    index = _pairs(table)
+    rows = _pairs(np.sum(table, axis=1))
+    cols = _pairs(np.sum(table, axis=0))
+    expected = rows*cols/_pairs(n) if n > 1 else 0
+    max_index = (rows + cols)/2
 
+    if max_index == expected:
+        # both clusterings are trivial (one cluster, or singletons).
+        return 1.0
+    return float((index - expected)/(max_index - expected))
+
+
+def _entropy(counts):
+    p = counts[counts > 0]/np.sum(counts)
+    return -np.sum(p*np.log(p))
+
+
+def get_normalized_mutual_info(clusters1, clusters2):
+    """
+    Gives the mutual information of two clusterings divided by the
+    mean of their entropies (1 for identical partitions, 0 for
+    independent ones), from their contingency table.
+
+    Params:
+        cluster1 (list): list of list of vertices forming cluster1
+                         (or array of cluster labels).
+        cluster2 (list): list of list of vertices forming cluster2
+                         (or array of cluster labels).
+
+    Returns:
+        nmi (float): the normalized mutual information.
+    """
+    table = np.asarray(get_group_cluster_matrix(clusters1, clusters2),
+                       dtype=np.float64)
+    n = np.sum(table)
+    if n == 0:
+        return 1.0
+
+    h1 = _entropy(np.sum(table, axis=1))
+    h2 = _entropy(np.sum(table, axis=0))
+    if h1 == 0 and h2 == 0:
+        return 1.0
+
+    rows, cols = np.nonzero(table)
+    p = table[rows, cols]/n
+    p1 = np.sum(table, axis=1)[rows]/n
+    p2 = np.sum(table, axis=0)[cols]/n
+    mutual_info = np.sum(p*np.log(p/(p1*p2)))
+
+    return float(max(mutual_info, 0)/((h1 + h2)/2))